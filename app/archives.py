@@ -0,0 +1,66 @@
+# app/archives.py
+import os
+import tarfile
+import tempfile
+import zipfile
+from typing import IO, Iterator
+
+ARCHIVE_SUFFIXES = (".zip", ".tar.gz", ".tgz")
+
+# Members are copied out in chunks of this size
+MEMBER_CHUNK_BYTES = 1024 * 1024
+
+
+class ArchiveError(Exception):
+    """The archive is unreadable or a member is larger than allowed."""
+
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def iter_archive_pdfs(path: str, directory: str, max_member_bytes: int) -> Iterator[tuple[str, str]]:
+    """
+    Yields (spooled_path, member_filename) for each PDF inside a .zip/.tar.gz.
+    Members are read one at a time and copied to `directory` in chunks, so the
+    archive is never unpacked in full; the caller deletes each file once parsed.
+    """
+    try:
+        if path.lower().endswith(".zip"):
+            with zipfile.ZipFile(path) as zf:
+                for info in zf.infolist():
+                    if info.is_dir() or not info.filename.lower().endswith(".pdf"):
+                        continue
+                    if info.file_size > max_member_bytes:
+                        raise ArchiveError(f"{info.filename} is too large")
+                    with zf.open(info) as src:
+                        yield _spool_member(src, directory, max_member_bytes), \
+                            os.path.basename(info.filename)
+        else:
+            # "r|gz" streams members in order without seeking back
+            with tarfile.open(path, "r|gz") as tf:
+                for member in tf:
+                    if not member.isfile() or not member.name.lower().endswith(".pdf"):
+                        continue
+                    if member.size > max_member_bytes:
+                        raise ArchiveError(f"{member.name} is too large")
+                    yield _spool_member(tf.extractfile(member), directory, max_member_bytes), \
+                        os.path.basename(member.name)
+    # zipfile raises RuntimeError for encrypted members and
+    # NotImplementedError for compression methods it can't read
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError,
+            RuntimeError, NotImplementedError) as e:
+        raise ArchiveError(str(e)) from e
+
+
+def _spool_member(src: IO[bytes], directory: str, max_member_bytes: int) -> str:
+    fd, out_path = tempfile.mkstemp(dir=directory, suffix=".pdf")
+    written = 0
+    with os.fdopen(fd, "wb") as out:
+        while chunk := src.read(MEMBER_CHUNK_BYTES):
+            written += len(chunk)
+            # Don't trust declared sizes alone (e.g. zip bombs)
+            if written > max_member_bytes:
+                raise ArchiveError("archive member is too large")
+            out.write(chunk)
+    return out_path
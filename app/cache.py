@@ -0,0 +1,268 @@
+# app/cache.py
+import fcntl
+import json
+import os
+import pickle
+import sqlite3
+import stat
+import tempfile
+import time
+from app.config import CACHE_DIR
+
+# Directories already checked by private_directory, with the outcome
+_checked_directories = {}
+
+
+def private_directory(path: str) -> bool:
+    """
+    Creates path (mode 0700) if missing. False, with a warning, if it is not
+    a real directory owned by this user and closed to group/other writes:
+    cache entries are unpickled, so anyone able to plant one could run code.
+    """
+    if path in _checked_directories:
+        return _checked_directories[path]
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        st = os.lstat(path)
+        safe = stat.S_ISDIR(st.st_mode) and st.st_uid == os.geteuid() and not st.st_mode & 0o022
+    except OSError:
+        safe = False
+    if not safe:
+        print(f"[WARN] Cache directory {path} is not private to this user; caching disabled")
+    _checked_directories[path] = safe
+    return safe
+
+
+class DiskCache:
+    """
+    Small on-disk key/value cache with LRU eviction by total size.
+    Entries are written atomically and eviction runs under a file lock,
+    so several uvicorn workers can share the same directory safely.
+    Entries are pickled, or stored as JSON with use_json (plain lists/dicts,
+    nothing executable on load).
+    """
+
+    def __init__(self, name: str, max_bytes: int, use_json: bool = False):
+        self.directory = os.path.join(CACHE_DIR, name)
+        self.max_bytes = max_bytes
+        self.use_json = use_json
+        self.suffix = ".json" if use_json else ".pkl"
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _usable(self) -> bool:
+        return (self.enabled and private_directory(CACHE_DIR)
+                and private_directory(self.directory))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{self.suffix}")
+
+    def get(self, key: str):
+        """
+        Returns the cached value, or None on a miss.
+        A hit refreshes the entry's mtime, which is what LRU eviction orders by.
+        """
+        if not self._usable():
+            return None
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = json.load(f) if self.use_json else pickle.load(f)
+            os.utime(path)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            # Missing, evicted mid-read, or corrupt: treat all as a miss
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value) -> None:
+        if not self._usable():
+            return
+
+        # Write to a temp file first so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if self.use_json:
+                    f.write(json.dumps(value).encode())
+                else:
+                    pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        self._evict()
+
+    def _evict(self) -> None:
+        """
+        Deletes least recently used entries until the cache fits in max_bytes.
+        """
+        with open(os.path.join(self.directory, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+            entries = []
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith(self.suffix):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
+
+    def stats(self) -> dict:
+        entries, size = 0, 0
+        if os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(self.suffix):
+                    entries += 1
+                    try:
+                        size += entry.stat().st_size
+                    except OSError:
+                        pass
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+
+class SqliteCache:
+    """
+    Key/value cache in a single SQLite file, for many small entries (one per
+    job block) where a file per entry would make eviction scans too slow.
+    Evicts by age and by total size, least recently used first. WAL mode and
+    a busy timeout let several uvicorn workers share the file.
+    """
+
+    def __init__(self, name: str, max_bytes: int, max_age_seconds: float = 0):
+        self.path = os.path.join(CACHE_DIR, f"{name}.sqlite3")
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if not private_directory(CACHE_DIR):
+            raise sqlite3.OperationalError(f"{CACHE_DIR} is not private to this user")
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+            "size INTEGER NOT NULL, used REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_used ON entries (used)")
+        return conn
+
+    def get_many(self, keys: list[str]) -> dict:
+        """
+        Returns {key: value} for the keys present; a hit refreshes the
+        entry's last-used time, which is what eviction orders by.
+        """
+        if not self.enabled or not keys:
+            return {}
+
+        found = {}
+        try:
+            conn = self._connect()
+            try:
+                # Stay well under SQLite's bound-parameter limit
+                for i in range(0, len(keys), 500):
+                    chunk = keys[i:i + 500]
+                    marks = ",".join("?" * len(chunk))
+                    rows = conn.execute(
+                        f"SELECT key, value FROM entries WHERE key IN ({marks})", chunk)
+                    for key, value in rows:
+                        try:
+                            found[key] = pickle.loads(value)
+                        except (pickle.UnpicklingError, EOFError):
+                            continue
+                    with conn:
+                        conn.execute(
+                            f"UPDATE entries SET used = ? WHERE key IN ({marks})",
+                            [time.time(), *chunk])
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"[WARN] Cache {self.path} unavailable: {e}")
+            found = {}
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, items: dict) -> None:
+        if not self.enabled or not items:
+            return
+
+        now = time.time()
+        rows = []
+        for key, value in items.items():
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            rows.append((key, blob, len(blob), now))
+
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO entries (key, value, size, used) "
+                        "VALUES (?, ?, ?, ?)", rows)
+                    self._evict(conn, now)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"[WARN] Cache {self.path} unavailable: {e}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """
+        Drops entries unused for max_age_seconds, then least recently used
+        entries until the cache fits in max_bytes.
+        """
+        if self.max_age_seconds:
+            conn.execute("DELETE FROM entries WHERE used < ?", (now - self.max_age_seconds,))
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        stale = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY used"):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+
+    def stats(self) -> dict:
+        entries, size = 0, 0
+        if os.path.exists(self.path):
+            try:
+                conn = self._connect()
+                try:
+                    entries, size = conn.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+                finally:
+                    conn.close()
+            except sqlite3.Error:
+                pass
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
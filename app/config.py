@@ -59,6 +59,7 @@
 # MAX_UPLOAD_FILES = 6
 
 # app/config.py
+import os
 
 # =========================
 # ROLE DEFINITIONS
@@ -129,6 +130,19 @@ IGNORE_DOMAINS = {
     "jobcurator.in", "telegram.org", "jobcurator.com", "rediffmail.com"
 }
 
+# Contact email priority (refiner.extract_valid_email):
+# domains containing any of these are never used
+BLOCKED_EMAIL_KEYWORDS = ["jobcurator", "telegram", "whatsapp", "noreply", "donotreply"]
+
+# Used only when the block has no corporate email
+GENERIC_EMAIL_DOMAINS = {
+    "gmail.com", "outlook.com", "yahoo.com",
+    "hotmail.com", "rediffmail.com", "icloud.com"
+}
+
+# Distinct domains whose classification is memoized per process
+EMAIL_DOMAIN_CACHE_SIZE = 4096
+
 INDIAN_CITIES = [
     "Bangalore", "Bengaluru", "Hyderabad", "Chennai", "Pune",
     "Mumbai", "Delhi", "Noida", "Gurgaon", "Gurugram", "Kolkata",
@@ -141,4 +155,123 @@ FOREIGN_LOCATIONS = [
     "Dubai", "UAE", "Australia", "Germany", "Remote - US"
 ]
 
-MAX_UPLOAD_FILES = 6
+# =========================
+# REFINEMENT KEYWORDS
+# =========================
+# Domain tagging: the first domain with a matching keyword wins
+DOMAIN_KEYWORDS = [
+    ("FinTech", ["bank", "fintech", "payment", "financial"]),
+    ("Healthcare", ["health", "medical", "pharma"]),
+    ("E-commerce", ["ecommerce", "retail", "shopping"]),
+    ("SaaS", ["saas"])
+]
+
+# Tech notes: (Output Format, Search Keyword) in priority order, max 4 reported
+TECH_NOTE_KEYWORDS = [
+    ("Java", "java"),
+    ("Python", "python"),
+    ("Selenium", "selenium"),
+    ("API", "api"),
+    ("Manual", "manual"),
+    ("SQL", "sql"),
+    ("Appium", "appium"),
+    ("Playwright", "playwright")
+]
+
+# Per-batch limits over all PDFs in a request, whether uploaded directly or
+# inside .zip/.tar.gz archives. Pages are counted by the parse workers, so
+# the page limit stops a batch after the window of PDFs that crosses it.
+MAX_BATCH_BYTES = 200 * 1024 * 1024
+MAX_BATCH_PAGES = 3000
+
+# =========================
+# DEDUPLICATION
+# =========================
+# Master keys are kept as 64-bit digests in a sorted array. A Bloom filter
+# of this many bits per key can sit in front of it to answer most misses
+# without the binary search; 0 leaves it out.
+DEDUP_BLOOM_BITS_PER_KEY = 0
+
+# Generated trackers carry a compressed copy of the master sheet's data so
+# the next upload loads without parsing the sheet XML. The copy is ignored
+# once the sheet has been edited.
+EMBED_MASTER_SNAPSHOT = True
+
+# =========================
+# NEAR-DUPLICATE DETECTION
+# =========================
+# New jobs whose posting text is at least this similar (estimated Jaccard
+# over word shingles) to a master row or an earlier new job are flagged in
+# "Possible Duplicate Of", never dropped. Set to 0 to disable.
+NEAR_DUP_THRESHOLD = 0.7
+NEAR_DUP_SHINGLE_WORDS = 2
+
+# MinHash signature length, split into LSH bands of NUM_PERM // BANDS values.
+# Candidates share at least one band; more bands find weaker matches.
+NEAR_DUP_NUM_PERM = 64
+NEAR_DUP_BANDS = 16
+
+# =========================
+# PARSING
+# =========================
+# Worker processes used to parse uploaded PDFs in parallel (one PDF per worker).
+# Set to 0 to parse serially in the request process (useful for debugging).
+PARSE_WORKERS = os.cpu_count() or 1
+
+# Compilations longer than PDF_SHARD_PAGE_THRESHOLD pages are split into
+# PDF_SHARD_PAGES-page ranges, extracted by separate workers and stitched back
+# in page order before block splitting. Set the threshold to 0 to disable.
+PDF_SHARD_PAGE_THRESHOLD = 100
+PDF_SHARD_PAGES = 50
+
+# Per-task budget for a parse worker (one PDF, or one page range of a sharded
+# PDF). A file over budget is killed, skipped and listed in the response's
+# X-Parse-Skipped header while the rest of the batch finishes. 0 = no limit;
+# with both at 0 a plain process pool is used.
+PDF_TIME_BUDGET_SECONDS = 120
+PDF_MEMORY_BUDGET_MB = 2048
+
+# Text extraction backend: "pdfplumber" (default) or "lean" (pdfminer's plain
+# text converter; falls back to pdfplumber when it fails or returns no text).
+# On text-only job-list PDFs lean took 12-14 ms/page against pdfplumber's
+# 25-29 ms/page; layout-heavy or scanned PDFs were not measured. Can be
+# overridden per request on /process.
+PDF_TEXT_BACKEND = "pdfplumber"
+
+# =========================
+# CACHING
+# =========================
+# Per-user by default: caches hold pickled entries, so the directory must not
+# be writable by anyone else (app/cache.py refuses one that is).
+CACHE_DIR = os.environ.get(
+    "JOB_CURATOR_CACHE_DIR",
+    os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "job_curator"))
+
+# Parsed block lists keyed by the SHA-256 of the PDF bytes. 0 disables the cache.
+PDF_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Stage-1/refinement results per block, keyed by block text + rules version.
+# 0 disables the cache; entries unused for BLOCK_CACHE_MAX_AGE_DAYS are dropped.
+BLOCK_CACHE_MAX_BYTES = 64 * 1024 * 1024
+BLOCK_CACHE_MAX_AGE_DAYS = 90
+
+# Dedup key sets of uploaded masters, keyed by the file's SHA-256, so an
+# unchanged previous Excel skips rebuilding its index. 0 disables the cache.
+DEDUP_INDEX_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Parsed previous masters, keyed by the file's SHA-256, so re-uploading the
+# same tracker skips parsing it. 0 disables the cache.
+MASTER_FRAME_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Per-block features saved by every /process run so /rescore and
+# `python -m app.rescore` can re-run the rules without the PDFs.
+# An empty path disables the store; runs older than the max age are pruned.
+FEATURE_STORE_PATH = os.environ.get(
+    "JOB_CURATOR_FEATURE_STORE", os.path.join(CACHE_DIR, "features.sqlite3"))
+FEATURE_STORE_MAX_AGE_DAYS = 120
+
+# Optional server-side master tracker (SQLite). When set, /process calls
+# without a previous_excel append to it, so clients only upload new PDFs
+# and can download just the new rows (?delta=1). Empty (the default) keeps
+# the upload-the-previous-Excel flow only.
+MASTER_STORE_PATH = os.environ.get("JOB_CURATOR_MASTER_STORE", "")
@@ -1,20 +1,80 @@
+import hashlib
+import math
+import numpy as np
 import pandas as pd
 import io
+from typing import Optional
+from app.cache import DiskCache
+from app.config import (
+    DEDUP_INDEX_CACHE_MAX_BYTES, DEDUP_BLOOM_BITS_PER_KEY, MASTER_FRAME_CACHE_MAX_BYTES
+)
+from app.snapshot import read_snapshot
+from app.xlsx_reader import read_sheet
 
+# Columns that make up the composite dedup key
+KEY_COLUMNS = ["Company", "Role", "Email"]
 
-def load_previous_df(file_bytes: bytes) -> pd.DataFrame:
+# Bump when the key normalization changes, to invalidate cached indexes
+DEDUP_INDEX_VERSION = 2
+
+# Joins the key columns before hashing; never appears in cell text
+KEY_SEPARATOR = "\x1f"
+
+# Key indexes of previously uploaded masters, keyed by the file's SHA-256
+KEY_INDEX_CACHE = DiskCache("dedup_keys", DEDUP_INDEX_CACHE_MAX_BYTES)
+
+# Parsed previous masters, keyed by the file's SHA-256
+MASTER_FRAME_CACHE = DiskCache("master_frames", MASTER_FRAME_CACHE_MAX_BYTES)
+
+
+def master_digest(path: str) -> str:
+    """SHA-256 of an uploaded master, the key of its cached frame and key index."""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def load_previous_df(source, digest: str = None) -> pd.DataFrame:
     """
-    Loads the previous Excel file into a pandas DataFrame.
+    Loads the previous Excel file (a path or raw bytes) into a pandas DataFrame.
     Standardizes column names to ensure reliable key extraction.
+    With the file's digest (see master_digest), a master uploaded before is
+    taken from MASTER_FRAME_CACHE instead of being parsed again.
     """
+    # Pickled frames are only read back by the pandas that wrote them
+    cache_key = f"{digest}-pandas{pd.__version__}" if digest else None
+    if cache_key:
+        cached = MASTER_FRAME_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+
     try:
-        df = pd.read_excel(io.BytesIO(file_bytes))
+        df = _read_master(source if isinstance(source, str) else io.BytesIO(source))
         # Strip whitespace from column headers
         df.columns = [c.strip() for c in df.columns]
-        return df
     except Exception:
         return pd.DataFrame()
 
+    if cache_key:
+        MASTER_FRAME_CACHE.set(cache_key, df)
+    return df
+
+
+def _read_master(source) -> pd.DataFrame:
+    """
+    A tracker this app wrote and nobody edited since loads from its embedded
+    snapshot. Otherwise the streaming reader parses it; workbooks it can't
+    lay out go through pd.read_excel.
+    """
+    df = read_snapshot(source)
+    if df is not None:
+        return df
+    try:
+        return read_sheet(source)
+    except Exception:
+        if not isinstance(source, str):
+            source.seek(0)
+        return pd.read_excel(source)
+
 
 def get_start_sno(df: pd.DataFrame) -> int:
     """
@@ -34,40 +94,140 @@ def get_start_sno(df: pd.DataFrame) -> int:
         return 1
 
 
-def get_existing_keys(df: pd.DataFrame) -> set:
+def normalize_key_value(value) -> str:
+    """Strict lowercase and stripping, the same for master rows and new jobs."""
+    return str(value).strip().lower()
+
+
+def job_key(job: dict) -> tuple:
+    """Normalized composite key (company, role, email) of a refined job."""
+    return tuple(normalize_key_value(job.get(col, "")) for col in KEY_COLUMNS)
+
+
+def _joined_digest(joined: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(joined.encode("utf-8", "surrogatepass"), digest_size=8).digest(), "little")
+
+
+def key_digest(key: tuple) -> int:
+    """64-bit digest of a normalized key (see job_key)."""
+    return _joined_digest(KEY_SEPARATOR.join(key))
+
+
+class BloomFilter:
+    """Bit array over 64-bit digests; k probes by double hashing of the digest halves."""
+
+    def __init__(self, digests: np.ndarray, bits_per_key: int):
+        self.size = max(64, len(digests) * bits_per_key)
+        self.probes = max(1, round(bits_per_key * math.log(2)))
+        bits = np.zeros((self.size + 7) // 8, np.uint8)
+        low = digests & np.uint64(0xFFFFFFFF)
+        high = digests >> np.uint64(32)
+        for i in range(self.probes):
+            positions = (low + np.uint64(i) * high) % np.uint64(self.size)
+            np.bitwise_or.at(bits, positions >> np.uint64(3),
+                             np.left_shift(1, positions & np.uint64(7)).astype(np.uint8))
+        # bytes indexing is much cheaper than NumPy scalar access per probe
+        self.bits = bits.tobytes()
+
+    def might_contain(self, digest: int) -> bool:
+        low, high = digest & 0xFFFFFFFF, digest >> 32
+        for i in range(self.probes):
+            position = (low + i * high) % self.size
+            if not self.bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class KeyIndex:
     """
-    Extracts a set of composite keys (Company + Role + Email) from the dataframe
-    for fast deduplication lookup.
+    Set-like store of dedup keys (see job_key), holding 64-bit digests rather
+    than tuples of strings: the master's keys in a sorted NumPy array (8 bytes
+    per row), keys added while a batch is appended in a small set. A false
+    match needs a 64-bit collision, about 1 in 10^14 per lookup at 10^5 rows.
     """
+
+    def __init__(self, digests: np.ndarray = None):
+        self._sorted = np.unique(digests) if digests is not None else np.empty(0, np.uint64)
+        self._added = set()
+        self._bloom: Optional[BloomFilter] = None
+        if DEDUP_BLOOM_BITS_PER_KEY and len(self._sorted):
+            self._bloom = BloomFilter(self._sorted, DEDUP_BLOOM_BITS_PER_KEY)
+
+    def __len__(self) -> int:
+        return len(self._sorted) + len(self._added)
+
+    def _has_digest(self, digest: int) -> bool:
+        if digest in self._added:
+            return True
+        if self._bloom is not None and not self._bloom.might_contain(digest):
+            return False
+        i = int(np.searchsorted(self._sorted, np.uint64(digest)))
+        return i < len(self._sorted) and int(self._sorted[i]) == digest
+
+    def __contains__(self, key: tuple) -> bool:
+        return self._has_digest(key_digest(key))
+
+    def add(self, key: tuple) -> None:
+        digest = key_digest(key)
+        if not self._has_digest(digest):
+            self._added.add(digest)
+
+
+def get_existing_keys(df: pd.DataFrame, digest: str = None) -> KeyIndex:
+    """
+    Extracts the composite keys (Company + Role + Email) of the dataframe
+    into a KeyIndex for fast deduplication lookup.
+    With the master file's digest (see master_digest), an unchanged master
+    reuses the index built the last time it was uploaded.
+    """
+    cache_key = f"{digest}-v{DEDUP_INDEX_VERSION}" if digest else None
+    if cache_key:
+        cached = KEY_INDEX_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+
     if df.empty:
-        return set()
+        return KeyIndex()
 
     # Ensure required columns exist
-    req_cols = ["Company", "Role", "Email"]
-    if not all(col in df.columns for col in req_cols):
-        return set()
-
-    keys = set()
-    for _, row in df.iterrows():
-        # Create normalized key: (company, role, email)
-        # using strict lowercase and stripping
-        comp = str(row["Company"]).strip().lower()
-        role = str(row["Role"]).strip().lower()
-        email = str(row["Email"]).strip().lower()
+    if not all(col in df.columns for col in KEY_COLUMNS):
+        return KeyIndex()
 
-        keys.add((comp, role, email))
+    # Column-wise normalize_key_value: str() each cell, then strip + lowercase
+    columns = [df[col].map(str).str.strip().str.lower() for col in KEY_COLUMNS]
+    joined = columns[0].str.cat(columns[1:], sep=KEY_SEPARATOR)
+    keys = KeyIndex(np.fromiter(map(_joined_digest, joined), np.uint64, len(joined)))
 
+    if cache_key:
+        KEY_INDEX_CACHE.set(cache_key, keys)
     return keys
 
 
-def is_duplicate(new_job: dict, existing_keys: set) -> bool:
+def is_duplicate(new_job: dict, existing_keys: KeyIndex) -> bool:
     """
     Checks if the new job's composite key exists in the set of existing keys.
     """
-    comp = str(new_job.get("Company", "")).strip().lower()
-    role = str(new_job.get("Role", "")).strip().lower()
-    email = str(new_job.get("Email", "")).strip().lower()
+    return job_key(new_job) in existing_keys
+
+
+def append_new_jobs(refined_batch: list, existing_keys: KeyIndex, start_sno: int) -> list:
+    """
+    Keeps the refined jobs whose key isn't in existing_keys (nor earlier in
+    the batch), numbering them from start_sno. Adds their keys to existing_keys.
+    """
+    final_new_jobs = []
+    current_sno_counter = start_sno
+
+    for job in refined_batch:
+        key = job_key(job)
+        if key in existing_keys:
+            continue
+
+        job["S.No"] = current_sno_counter
+        current_sno_counter += 1
 
-    key = (comp, role, email)
+        final_new_jobs.append(job)
+        existing_keys.add(key)
 
-    return key in existing_keys
+    return final_new_jobs
@@ -78,46 +78,160 @@
 
 import pandas as pd
 import io
-
-
-def generate_master_excel(final_df: pd.DataFrame) -> io.BytesIO:
+import math
+import numpy as np
+from datetime import date, datetime, time
+from openpyxl import Workbook
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+from openpyxl.utils import get_column_letter
+from app.config import EMBED_MASTER_SNAPSHOT
+from app.near_dup import FLAG_COLUMN, SIGNATURE_SHEET
+from app.snapshot import master_snapshot, save_workbook
+
+# Header look of pandas' to_excel, which earlier trackers were written with
+HEADER_FONT = Font(bold=True)
+HEADER_BORDER = Border(
+    left=Side(style="thin"), right=Side(style="thin"),
+    top=Side(style="thin"), bottom=Side(style="thin"))
+HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="top")
+
+# Number formats pandas gives date/time cells
+DATETIME_FORMAT = "YYYY-MM-DD HH:MM:SS"
+DATE_FORMAT = "YYYY-MM-DD"
+
+
+def generate_master_excel(final_df: pd.DataFrame, diagnostics_df: pd.DataFrame = None,
+                          signatures_df: pd.DataFrame = None) -> io.BytesIO:
     """
     Generates a SINGLE Excel file containing the Final Master Tracker data.
+    A Stage1_Diagnostics sheet is added after it when diagnostics_df is given,
+    and the rows' MinHash signatures go to a hidden sheet when signatures_df is.
+    Sheets are streamed row by row (openpyxl write-only mode), so no cell
+    objects are kept in memory. With EMBED_MASTER_SNAPSHOT, the master data
+    as it reads back is embedded too (see app/snapshot.py).
     """
     # Enforce exact column order
     cols = [
         "S.No", "Company", "Role", "Exp", "Location",
-        "Mode", "Email", "Source_PDF", "Notes", "Domain", "Last Updated"
+        "Mode", "Email", "Source_PDF", "Notes", "Domain", "Last Updated",
+        "Seen In", FLAG_COLUMN
     ]
 
     # Ensure all columns exist in the dataframe
     if not final_df.empty:
         for c in cols:
             if c not in final_df.columns:
-                final_df[c] = "N/A"
+                # Only flagged rows carry a near-duplicate note
+                final_df[c] = "" if c == FLAG_COLUMN else "N/A"
         # Reorder and filter columns to match strict requirement
         final_df = final_df[cols]
     else:
         # Create empty DataFrame with correct columns if no data
         final_df = pd.DataFrame(columns=cols)
 
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        final_df.to_excel(writer, index=False, sheet_name="Master_Tracker")
-
-        # Auto-adjust column widths
-        ws = writer.sheets['Master_Tracker']
-        for column in ws.columns:
-            max_len = 0
-            col_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    val_len = len(str(cell.value))
-                    if val_len > max_len:
-                        max_len = val_len
-                except:
-                    pass
-            ws.column_dimensions[col_letter].width = max_len + 2
-
-    output.seek(0)
-    return output
+    wb = Workbook(write_only=True)
+    # Auto-adjust column widths to the longest value
+    write_sheet(wb, "Master_Tracker", final_df, fit_widths=True)
+
+    if diagnostics_df is not None:
+        write_sheet(wb, "Stage1_Diagnostics", diagnostics_df)
+
+    if signatures_df is not None and not signatures_df.empty:
+        ws = write_sheet(wb, SIGNATURE_SHEET, signatures_df)
+        ws.sheet_state = "hidden"
+
+    snapshot = master_snapshot(final_df) if EMBED_MASTER_SNAPSHOT else None
+    return save_workbook(wb, snapshot)
+
+
+def write_sheet(wb: Workbook, title: str, df: pd.DataFrame, fit_widths: bool = False):
+    """
+    Streams df into a new write-only sheet, cell values and header style as
+    DataFrame.to_excel(index=False) writes them. With fit_widths, each column
+    is as wide as its longest value (as text) plus 2.
+    """
+    ws = wb.create_sheet(title)
+    columns = [_excel_values(ws, df.iloc[:, i]) for i in range(df.shape[1])]
+
+    # Write-only sheets take their column widths before any row
+    if fit_widths:
+        for i, (name, values) in enumerate(zip(df.columns, columns), 1):
+            width = max(len(str(name)), _max_text_length(df.iloc[:, i - 1], values))
+            ws.column_dimensions[get_column_letter(i)].width = width + 2
+
+    header = []
+    for name in df.columns:
+        cell = WriteOnlyCell(ws, value=str(name))
+        cell.font = HEADER_FONT
+        cell.border = HEADER_BORDER
+        cell.alignment = HEADER_ALIGNMENT
+        header.append(cell)
+    ws.append(header)
+
+    for row in zip(*columns):
+        ws.append(row)
+    return ws
+
+
+def _excel_values(ws, column: pd.Series) -> list:
+    """A column's cell values: missing values become empty cells, numpy scalars plain Python."""
+    if _is_plain_integer(column):
+        return column.tolist()
+    return [value if type(value) is str else _excel_value(ws, value) for value in column.tolist()]
+
+
+def _is_plain_integer(column: pd.Series) -> bool:
+    """NumPy int/uint/bool columns: no missing values, tolist() gives Python scalars."""
+    return isinstance(column.dtype, np.dtype) and column.dtype.kind in "iub"
+
+
+def _excel_value(ws, value):
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, float):
+        if math.isnan(value):
+            return None
+        if math.isinf(value):
+            return "inf" if value > 0 else "-inf"
+        return value
+    if isinstance(value, (bool, int, str)):
+        return value
+    if isinstance(value, (datetime, date, time)):
+        if isinstance(value, pd.Timestamp):
+            value = value.to_pydatetime()
+        cell = WriteOnlyCell(ws, value=value)
+        if isinstance(value, datetime):
+            cell.number_format = DATETIME_FORMAT
+        elif isinstance(value, date):
+            cell.number_format = DATE_FORMAT
+        return cell
+    if pd.api.types.is_scalar(value) and pd.isna(value):
+        return None
+    if hasattr(value, "item"):
+        return _excel_value(ws, value.item())
+    return str(value)
+
+
+def _max_text_length(column: pd.Series, values: list) -> int:
+    """Longest str() of the written values; empty cells count 0."""
+    if _is_plain_integer(column):
+        return int(column.astype(str).str.len().max()) if len(column) else 0
+
+    longest, others = 0, values
+    if column.dtype == object:
+        # Text cells vectorized; only the few non-text cells go through str()
+        try:
+            lengths = column.str.len()
+        except AttributeError:  # no text in the column
+            lengths = None
+        if lengths is not None:
+            longest = int(lengths.max()) if lengths.notna().any() else 0
+            others = [values[i] for i in (lengths.isna() & column.notna()).to_numpy().nonzero()[0]]
+
+    for value in others:
+        if isinstance(value, Cell):
+            value = value.value
+        if value is not None:
+            longest = max(longest, len(str(value)))
+    return longest
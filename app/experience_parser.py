@@ -37,35 +37,44 @@
 import re
 from typing import Tuple, Optional
 
+# All four experience patterns in one pass, sharing the leading number:
+#   1. "3 to 5 years"  2. "3-5 years" / "3 – 5 years"  3. "3+ years"
+#   4. "Minimum 3 years" or just "3 years"
+# Case is matched with explicit classes instead of lowercasing the block.
+# The old optional "min|minimum|at least" prefix on (4) is dropped, since
+# it never changed which number matched.
+EXPERIENCE_PATTERN = re.compile(
+    r'(?P<start>\d+)(?:\s*(?:(?P<to>[tT][oO])|[-–—])\s*(?P<end>\d+)\s*[yY]'
+    r'|(?P<plus>\+)\s*[yY]|\s*[yY])'
+)
+
 
 def extract_experience_years(text: str) -> Tuple[Optional[int], Optional[int]]:
     """
     Parses experience ranges.
     Returns (min_exp, max_exp).
     Example: "3-5 years" -> (3, 5). "4+ years" -> (4, None).
+    A higher-priority pattern anywhere in the text beats an earlier
+    lower-priority one, so only a "to" range can end the scan early.
     """
-    t = (text or "").lower()
-    t = t.replace("–", "-").replace("—", "-")  # Normalize dashes
-
-    # 1. "3 to 5 years"
-    m = re.search(r'(\d+)\s*to\s*(\d+)\s*y', t)
-    if m:
-        return int(m.group(1)), int(m.group(2))
-
-    # 2. "3-5 years" or "3 - 5 years"
-    m = re.search(r'(\d+)\s*-\s*(\d+)\s*y', t)
-    if m:
-        return int(m.group(1)), int(m.group(2))
-
-    # 3. "3+ years"
-    m = re.search(r'(\d+)\+\s*y', t)
-    if m:
-        return int(m.group(1)), None
-
-    # 4. "Minimum 3 years" or just "3 years"
-    m = re.search(r'(?:min|minimum|at least)?\s*(\d+)\s*y', t)
-    if m:
-        v = int(m.group(1))
-        return v, v
-
-    return None, None
+    dash = plus = years = None
+    for m in EXPERIENCE_PATTERN.finditer(text or ""):
+        start, to, end, plus_sign = m.group("start", "to", "end", "plus")
+        if to is not None:
+            return int(start), int(end)
+        if end is not None:
+            if dash is None:
+                dash = int(start), int(end)
+        elif plus_sign is not None:
+            if plus is None:
+                plus = int(start), None
+        elif years is None:
+            v = int(start)
+            years = v, v
+
+    return dash or plus or years or (None, None)
+
+
+def extract_experience_years_batch(texts: list[str]) -> list[Tuple[Optional[int], Optional[int]]]:
+    """extract_experience_years over every block of a request, in order."""
+    return [extract_experience_years(text) for text in texts]
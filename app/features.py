@@ -0,0 +1,171 @@
+# app/features.py
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+from typing import Iterator, Optional
+from app.cache import private_directory
+from app.config import FEATURE_STORE_PATH, FEATURE_STORE_MAX_AGE_DAYS
+from app.scanner import SCAN_KEYWORDS, KeywordHits
+
+# Identifies the keyword list the hit bitsets are taken over
+VOCABULARY = json.dumps(SCAN_KEYWORDS)
+VOCABULARY_ID = hashlib.sha256(VOCABULARY.encode()).hexdigest()[:16]
+
+
+def _mask_bytes(mask: int) -> bytes:
+    return mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+
+
+class FeatureStore:
+    """
+    Per-block features saved by every /process run, so rules can be re-run
+    (app/rescore.py) without the PDFs. Each distinct block text is stored
+    once (zlib-compressed, with its keyword hit bitsets and experience);
+    each run records which blocks it saw, from which file and in what order.
+    """
+
+    def __init__(self, path: str, max_age_days: float = 0):
+        self.path = path
+        self.max_age_days = max_age_days
+
+    @property
+    def enabled(self) -> bool:
+        # Off, with one warning, when its directory can't be used (see private_directory)
+        return bool(self.path) and private_directory(os.path.dirname(os.path.abspath(self.path)))
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS vocabularies (
+                id TEXT PRIMARY KEY, keywords TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS blocks (
+                text_hash TEXT PRIMARY KEY, text BLOB NOT NULL,
+                vocabulary TEXT NOT NULL, looked_up BLOB NOT NULL, present BLOB NOT NULL,
+                exp_min INTEGER, exp_max INTEGER);
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, created REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS run_blocks (
+                run_id INTEGER NOT NULL,
+                position INTEGER NOT NULL, source_pdf TEXT, block_id INTEGER,
+                text_hash TEXT NOT NULL,
+                PRIMARY KEY (run_id, position));
+            CREATE INDEX IF NOT EXISTS runs_created ON runs (created);
+        """)
+        return conn
+
+    def record_run(self, rows: list[tuple]) -> Optional[int]:
+        """
+        Saves one run. Each row is (source_pdf, block_id, text, looked_up,
+        present, exp_min, exp_max): the KeywordHits.to_masks() bitsets (0, 0
+        if the block was never scanned, e.g. a block-cache hit) and the
+        experience, None unless the rules parsed it. Returns the run id.
+        """
+        if not self.enabled or not rows:
+            return None
+
+        occurrences = []
+        for position, (source_pdf, block_id, text, *_) in enumerate(rows):
+            text_hash = hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+            occurrences.append((position, source_pdf, block_id, text_hash))
+
+        try:
+            conn = self._connect()
+            try:
+                # Only compress texts the store doesn't have yet
+                stored = set()
+                hashes = [occurrence[3] for occurrence in occurrences]
+                for i in range(0, len(hashes), 500):
+                    chunk = hashes[i:i + 500]
+                    stored.update(row[0] for row in conn.execute(
+                        f"SELECT text_hash FROM blocks WHERE text_hash IN ({','.join('?' * len(chunk))})",
+                        chunk))
+
+                blocks = {}
+                for (*_, text_hash), (_, _, text, looked_up, present, exp_min, exp_max) in zip(occurrences, rows):
+                    if text_hash in stored or text_hash in blocks:
+                        continue
+                    blocks[text_hash] = (
+                        text_hash, zlib.compress(text.encode("utf-8", "surrogatepass")),
+                        VOCABULARY_ID, _mask_bytes(looked_up), _mask_bytes(present), exp_min, exp_max)
+
+                with conn:
+                    conn.execute(
+                        "INSERT OR IGNORE INTO vocabularies (id, keywords) VALUES (?, ?)",
+                        (VOCABULARY_ID, VOCABULARY))
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO blocks VALUES (?, ?, ?, ?, ?, ?, ?)", blocks.values())
+                    run_id = conn.execute(
+                        "INSERT INTO runs (created) VALUES (?)", (time.time(),)).lastrowid
+                    conn.executemany(
+                        "INSERT INTO run_blocks VALUES (?, ?, ?, ?, ?)",
+                        [(run_id, *occurrence) for occurrence in occurrences])
+                    self._prune(conn)
+            finally:
+                conn.close()
+        except (sqlite3.Error, OSError) as e:
+            print(f"[WARN] Feature store {self.path} unavailable: {e}")
+            return None
+        return run_id
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        """Drops runs older than max_age_days and blocks no run refers to."""
+        if not self.max_age_days:
+            return
+        cutoff = time.time() - self.max_age_days * 24 * 3600
+        old_runs = [row[0] for row in conn.execute("SELECT id FROM runs WHERE created < ?", (cutoff,))]
+        if not old_runs:
+            return
+        conn.executemany("DELETE FROM run_blocks WHERE run_id = ?", [(r,) for r in old_runs])
+        conn.executemany("DELETE FROM runs WHERE id = ?", [(r,) for r in old_runs])
+        conn.execute(
+            "DELETE FROM blocks WHERE text_hash NOT IN (SELECT text_hash FROM run_blocks)")
+
+    def iter_blocks(self, since: float = None, until: float = None) -> Iterator[dict]:
+        """
+        Yields the stored blocks of every run created in [since, until)
+        (Unix times, both optional), in run and block order:
+        {"run_id", "source_pdf", "block_id", "text_hash", "text", "hits", "exp_min", "exp_max"}.
+        A text seen in several runs is only decoded the first time; later
+        occurrences carry text and hits as None, so callers key results by text_hash.
+        """
+        if not self.enabled or not os.path.exists(self.path):
+            return
+
+        conn = self._connect()
+        try:
+            vocabularies = {
+                vid: json.loads(keywords)
+                for vid, keywords in conn.execute("SELECT id, keywords FROM vocabularies")
+            }
+            rows = conn.execute(
+                "SELECT rb.run_id, rb.source_pdf, rb.block_id, b.text_hash, b.text, "
+                "b.vocabulary, b.looked_up, b.present, b.exp_min, b.exp_max "
+                "FROM runs r JOIN run_blocks rb ON rb.run_id = r.id "
+                "JOIN blocks b ON b.text_hash = rb.text_hash "
+                "WHERE r.created >= ? AND r.created < ? "
+                "ORDER BY rb.run_id, rb.position",
+                (since or 0, until or float("inf")))
+
+            seen = set()
+            for run_id, source_pdf, block_id, text_hash, blob, vid, looked_up, present, exp_min, exp_max in rows:
+                text = hits = None
+                if text_hash not in seen:
+                    seen.add(text_hash)
+                    text = zlib.decompress(blob).decode("utf-8", "surrogatepass")
+                    hits = KeywordHits.from_masks(
+                        text, vocabularies[vid],
+                        int.from_bytes(looked_up, "little"), int.from_bytes(present, "little"))
+                yield {
+                    "run_id": run_id, "source_pdf": source_pdf, "block_id": block_id,
+                    "text_hash": text_hash, "text": text, "hits": hits,
+                    "exp_min": exp_min, "exp_max": exp_max,
+                }
+        finally:
+            conn.close()
+
+
+FEATURE_STORE = FeatureStore(FEATURE_STORE_PATH, FEATURE_STORE_MAX_AGE_DAYS)
@@ -147,20 +147,63 @@ from fastapi import FastAPI, UploadFile, File, HTTPException, Request
 from fastapi.responses import StreamingResponse, HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from starlette.concurrency import run_in_threadpool
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
 from typing import List, Optional
+from urllib.parse import quote
 import pandas as pd
+import json
 import os
+import sqlite3
+import tempfile
 from datetime import datetime
 
-from app.config import MAX_UPLOAD_FILES
-from app.parser import extract_blocks_from_pdf
-from app.experience_parser import extract_experience_years
-from app.rules import evaluate_job_block
-from app.refiner import refine_job_batch
-from app.dedup import load_previous_df, get_start_sno, get_existing_keys, is_duplicate
+from app.config import (
+    MAX_BATCH_BYTES, MAX_BATCH_PAGES, PARSE_WORKERS,
+    PDF_TIME_BUDGET_SECONDS, PDF_MEMORY_BUDGET_MB, NEAR_DUP_THRESHOLD
+)
+from app.parser import extract_blocks_from_pdfs, PDF_CACHE, TEXT_BACKENDS
+from app.rules import BlockFeatures, evaluate_block, count_cached_evaluation, describe_evaluation, rule_stats
+from app.scanner import scan_block
+from app.refiner import refine_job_batch, BLOCK_FIELDS
+from app.memo import BLOCK_CACHE, block_memo, block_memo_key, block_fingerprint
+from app.features import FEATURE_STORE
+from app.rescore import rescore_stored_blocks, parse_date
+from app.dedup import (
+    load_previous_df, get_start_sno, get_existing_keys, append_new_jobs,
+    master_digest, KEY_INDEX_CACHE, MASTER_FRAME_CACHE, KeyIndex
+)
+from app.near_dup import flag_near_duplicates, load_signatures
+from app.master_store import MASTER_STORE
 from app.excel_writer import generate_master_excel
+from app.uploads import spool_upload
+from app.archives import ArchiveError, is_archive, iter_archive_pdfs
+from app.workers import BudgetedProcessPool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # PDF parsing is CPU-bound; keep one worker pool for the app's lifetime.
+    # PARSE_WORKERS = 0 keeps the serial in-process path for debugging.
+    if PARSE_WORKERS <= 0:
+        app.state.parse_pool = None
+    elif PDF_TIME_BUDGET_SECONDS or PDF_MEMORY_BUDGET_MB:
+        # Killable per-PDF workers so one pathological file can't stall the batch
+        app.state.parse_pool = BudgetedProcessPool(
+            PARSE_WORKERS, PDF_TIME_BUDGET_SECONDS, PDF_MEMORY_BUDGET_MB,
+            preload=["app.parser"])
+    else:
+        app.state.parse_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+    yield
+    if app.state.parse_pool is not None:
+        app.state.parse_pool.shutdown(cancel_futures=True)
+
 
-app = FastAPI(title="Job Curator (Single Excel Output)")
+app = FastAPI(title="Job Curator (Single Excel Output)", lifespan=lifespan)
+
+# PDFs handed to the parse pool at a time (keeps every worker busy)
+PARSE_WINDOW = max(PARSE_WORKERS, 1) * 2
 
 # --- UI CONFIGURATION ---
 os.makedirs("app/static", exist_ok=True)
@@ -175,19 +218,106 @@ async def read_root(request: Request):
     """Serve the single-page UI."""
     return templates.TemplateResponse("index.html", {"request": request})
 
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters of this worker's caches (per uvicorn process)."""
+    return {
+        "pdf_blocks": PDF_CACHE.stats(), "blocks": BLOCK_CACHE.stats(),
+        "dedup_keys": KEY_INDEX_CACHE.stats(), "master_frames": MASTER_FRAME_CACHE.stats(),
+    }
+
+
+@app.get("/rules/stats")
+async def get_rule_stats():
+    """Stage-1 rejections per rule (per uvicorn process)."""
+    return rule_stats()
+
+@app.get("/rescore")
+async def rescore(since: Optional[str] = None, until: Optional[str] = None):
+    """
+    Re-runs the current rules and refinement over the blocks saved by past
+    /process runs (?since=2026-09-01&until=2026-10-01), without the PDFs.
+    Returns the resulting tracker; the per-reason summary is in X-Rescore-Summary.
+    """
+    try:
+        window = (parse_date(since), parse_date(until))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD.")
+
+    rows, summary = await run_in_threadpool(rescore_stored_blocks, *window)
+    output_excel = await run_in_threadpool(generate_master_excel, pd.DataFrame(rows))
+
+    date_str = datetime.now().strftime('%Y-%m-%d')
+    return StreamingResponse(
+        output_excel,
+        headers={
+            'Content-Disposition': f'attachment; filename="Rescored_Master_Tracker_{date_str}.xlsx"',
+            'X-Rescore-Summary': json.dumps(summary)
+        },
+        media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+
+@app.get("/master")
+async def download_master():
+    """The full tracker kept in the master store (MASTER_STORE_PATH)."""
+    if not MASTER_STORE.enabled:
+        raise HTTPException(status_code=404, detail="No master store configured.")
+    try:
+        master_df, signatures_df = await run_in_threadpool(MASTER_STORE.export)
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=503, detail=f"Master store unavailable: {e}")
+    output_excel = await run_in_threadpool(generate_master_excel, master_df, None, signatures_df)
+    return tracker_response(output_excel, "Final_Master_Tracker")
+
+
+@app.post("/master/import")
+async def import_master(previous_excel: UploadFile = File(...)):
+    """
+    Seeds the master store from a tracker downloaded earlier; rows whose key
+    is already stored are skipped. Returns {"imported": <rows added>}.
+    """
+    if not MASTER_STORE.enabled:
+        raise HTTPException(status_code=404, detail="No master store configured.")
+    if not previous_excel.filename.lower().endswith('.xlsx'):
+        raise HTTPException(
+            status_code=400, detail="Previous file must be an Excel (.xlsx) file.")
+
+    with tempfile.TemporaryDirectory(prefix="job_curator_") as upload_dir:
+        previous_path = await spool_upload(previous_excel, upload_dir)
+        previous_df = await run_in_threadpool(load_previous_df, previous_path)
+        signatures_df = await run_in_threadpool(load_signatures, previous_path)
+    try:
+        imported = await run_in_threadpool(MASTER_STORE.import_tracker, previous_df, signatures_df)
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=503, detail=f"Master store unavailable: {e}")
+    return {"imported": imported}
+
 # --- BACKEND LOGIC ---
 
 
 @app.post("/process")
 async def process_jobs(
     files: List[UploadFile] = File(...),
-    previous_excel: Optional[UploadFile] = File(None)
+    previous_excel: Optional[UploadFile] = File(None),
+    backend: Optional[str] = None,
+    diagnostics: bool = False,
+    delta: bool = False
 ):
-    # Validate PDF File Count
-    pdf_files = [f for f in files if f.filename.lower().endswith('.pdf')]
-    if len(pdf_files) > MAX_UPLOAD_FILES:
+    """
+    Appends the jobs found in the PDFs to the previous_excel tracker, or,
+    without one, to the master store when MASTER_STORE_PATH is set. Returns
+    the merged tracker, or with ?delta=1 only the new rows.
+    """
+    # Validate text extraction backend (?backend=lean), defaults to config
+    if backend and backend not in TEXT_BACKENDS:
         raise HTTPException(
-            status_code=400, detail=f"Too many PDFs. Max {MAX_UPLOAD_FILES} allowed.")
+            status_code=400, detail=f"Unknown backend. Use one of: {', '.join(TEXT_BACKENDS)}.")
+
+    # Accept PDFs and .zip/.tar.gz archives of PDFs; the batch is limited by
+    # total PDF pages/bytes (checked while parsing), not by file count.
+    pdf_files = [f for f in files
+                 if f.filename.lower().endswith('.pdf') or is_archive(f.filename)]
 
     if not pdf_files:
         raise HTTPException(
@@ -196,85 +326,307 @@ async def process_jobs(
     # --- PREPARE APPEND MODE DATA ---
     previous_df = pd.DataFrame()
     start_sno = 1
-    existing_keys = set()
-
-    # Check if previous_excel exists AND has a filename (Day-1 fix logic preserved)
-    if previous_excel and previous_excel.filename:
-        if not previous_excel.filename.lower().endswith('.xlsx'):
-            raise HTTPException(
-                status_code=400, detail="Previous file must be an Excel (.xlsx) file.")
-
-        content = await previous_excel.read()
-        previous_df = load_previous_df(content)
-        start_sno = get_start_sno(previous_df)
-        existing_keys = get_existing_keys(previous_df)
-
-    # --- STAGE 1: PARSING & DIAGNOSTICS ---
-    stage1_results = []
-
-    for file in pdf_files:
-        content = await file.read()
-        blocks = extract_blocks_from_pdf(content, file.filename)
-
-        if not blocks:
-            # Skip empty files, proceed to next
-            continue
+    existing_keys = KeyIndex()
+    previous_signatures = None
+    use_store = MASTER_STORE.enabled and not (previous_excel and previous_excel.filename)
+
+    # Uploads are spooled to disk and parsed from there; the directory (and
+    # every spooled file) is removed once parsing is done or on any error.
+    with tempfile.TemporaryDirectory(prefix="job_curator_") as upload_dir:
+        # Check if previous_excel exists AND has a filename (Day-1 fix logic preserved)
+        if previous_excel and previous_excel.filename:
+            if not previous_excel.filename.lower().endswith('.xlsx'):
+                raise HTTPException(
+                    status_code=400, detail="Previous file must be an Excel (.xlsx) file.")
+
+            previous_path = await spool_upload(previous_excel, upload_dir)
+            # Hashing, parsing and indexing a large master takes seconds, so
+            # it runs off the event loop
+            digest = None
+            if KEY_INDEX_CACHE.enabled or MASTER_FRAME_CACHE.enabled:
+                digest = await run_in_threadpool(master_digest, previous_path)
+            previous_df = await run_in_threadpool(load_previous_df, previous_path, digest)
+            start_sno = get_start_sno(previous_df)
+            existing_keys = await run_in_threadpool(get_existing_keys, previous_df, digest)
+            if NEAR_DUP_THRESHOLD:
+                previous_signatures = await run_in_threadpool(load_signatures, previous_path)
+
+        # --- STAGE 1: PARSING & DIAGNOSTICS ---
+        # PDFs (uploaded directly or read one member at a time from archives)
+        # are parsed in small windows, so only a window's worth sits on disk.
+        uploads = [(await spool_upload(file, upload_dir), file.filename) for file in pdf_files]
+        pdf_stream = iter_batch_pdfs(uploads, upload_dir)
+
+        # The byte cap is checked as files arrive; pages are only counted by
+        # the (budgeted) parse workers, so that cap is checked per window.
+        too_large = HTTPException(
+            status_code=400,
+            detail=f"Batch too large. Max {MAX_BATCH_PAGES} pages or "
+                   f"{MAX_BATCH_BYTES // (1024 * 1024)} MB of PDFs allowed.")
+        parsed = []
+        window = []
+        batch_bytes = batch_pages = 0
+        while True:
+            try:
+                pdf = await run_in_threadpool(next, pdf_stream, None)
+            except ArchiveError as e:
+                raise HTTPException(
+                    status_code=400, detail=f"Could not read archive: {e}")
+
+            if pdf is not None:
+                batch_bytes += os.path.getsize(pdf[0])
+                if batch_bytes > MAX_BATCH_BYTES:
+                    raise too_large
+                window.append(pdf)
+
+            if window and (pdf is None or len(window) >= PARSE_WINDOW):
+                results = await run_in_threadpool(
+                    extract_blocks_from_pdfs, window, app.state.parse_pool, backend)
+                for path, _ in window:
+                    os.remove(path)
+                window = []
+                parsed += results
+                batch_pages += sum(result["pages"] for result in results)
+                if batch_pages > MAX_BATCH_PAGES:
+                    raise too_large
+
+            if pdf is None:
+                break
+
+    if not parsed:
+        raise HTTPException(
+            status_code=400, detail="No PDF files found in the upload.")
 
-        for idx, block_text in enumerate(blocks, 1):
-            exp_min, exp_max = extract_experience_years(block_text)
-            evaluation = evaluate_job_block(block_text, exp_min, exp_max)
+    use_memo = BLOCK_CACHE.enabled and not diagnostics
+    stage1_results, new_memos, feature_rows = await run_in_threadpool(
+        evaluate_batch_blocks, parsed, use_memo, diagnostics)
 
-            job_entry = {
-                "Source_PDF": file.filename,
-                "Block_ID": idx,
-                "Exp_Min": exp_min,
-                "Exp_Max": exp_max,
-                "Raw_Text": block_text,
-                **evaluation
-            }
-            stage1_results.append(job_entry)
+    await run_in_threadpool(FEATURE_STORE.record_run, feature_rows)
 
     # --- STAGE 2: REFINEMENT ---
-    refined_batch = refine_job_batch(stage1_results)
+    refined_batch, selected = await run_in_threadpool(
+        refine_selected, stage1_results, new_memos, use_memo)
 
     # --- DEDUPLICATION & APPEND LOGIC ---
-    final_new_jobs = []
-    current_sno_counter = start_sno
-
-    for job in refined_batch:
-        if is_duplicate(job, existing_keys):
-            continue
-
-        job["S.No"] = current_sno_counter
-        current_sno_counter += 1
-
-        final_new_jobs.append(job)
+    texts = [job["Raw_Text"] for job in selected]
+    if use_store:
+        # Dedup against the store, numbering and the insert are one store
+        # transaction; near-duplicates are flagged in it too
+        try:
+            final_new_jobs, new_signatures_df = await run_in_threadpool(
+                MASTER_STORE.append_jobs, refined_batch, texts)
+            if not delta:
+                previous_df, signatures_df = await run_in_threadpool(MASTER_STORE.export)
+        except sqlite3.Error as e:
+            raise HTTPException(status_code=503, detail=f"Master store unavailable: {e}")
+    else:
+        final_new_jobs = append_new_jobs(refined_batch, existing_keys, start_sno)
 
-        new_key = (
-            str(job.get("Company", "")).strip().lower(),
-            str(job.get("Role", "")).strip().lower(),
-            str(job.get("Email", "")).strip().lower()
-        )
-        existing_keys.add(new_key)
+        # Near-duplicates of master rows (or of each other) are flagged, not dropped
+        raw_texts = {id(entry): text for entry, text in zip(refined_batch, texts)}
+        signatures_df = flag_near_duplicates(
+            final_new_jobs, [raw_texts[id(job)] for job in final_new_jobs], previous_signatures)
+        # flag_near_duplicates lists the previous signatures first
+        previous_count = len(previous_signatures) if previous_signatures is not None else 0
+        new_signatures_df = signatures_df.iloc[previous_count:]
 
     # --- MERGE DATA ---
-    if final_new_jobs:
-        new_df = pd.DataFrame(final_new_jobs)
+    new_df = pd.DataFrame(final_new_jobs)
+    if delta:
+        # Only this run's rows
+        final_master_df, signatures_df = new_df, new_signatures_df
+    elif use_store:
+        # The export already holds the new rows
+        final_master_df = previous_df
+    elif final_new_jobs:
         # Append new jobs to previous dataframe
         final_master_df = pd.concat([previous_df, new_df], ignore_index=True)
     else:
         final_master_df = previous_df
 
     # --- OUTPUT ---
-    output_excel = generate_master_excel(final_master_df)
+    diagnostics_df = stage1_diagnostics_df(stage1_results) if diagnostics else None
+    output_excel = await run_in_threadpool(
+        generate_master_excel, final_master_df, diagnostics_df, signatures_df)
+    name = "New_Jobs" if delta else "Final_Master_Tracker"
+    return tracker_response(output_excel, name, parse_report_headers(parsed))
 
+
+def tracker_response(output_excel, name: str, headers: dict = None) -> StreamingResponse:
+    """The tracker as an .xlsx download named <name>_<date>.xlsx."""
     date_str = datetime.now().strftime('%Y-%m-%d')
-    filename = f"Final_Master_Tracker_{date_str}.xlsx"
+    filename = f"{name}_{date_str}.xlsx"
 
     return StreamingResponse(
         output_excel,
         headers={
-            'Content-Disposition': f'attachment; filename="{filename}"'
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            **(headers or {})
         },
         media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
     )
+
+
+def iter_batch_pdfs(uploads: list[tuple[str, str]], upload_dir: str):
+    """
+    Yields (path, filename) for every PDF in the batch: plain uploads as-is,
+    archives expanded one member at a time.
+    """
+    for path, filename in uploads:
+        if is_archive(filename):
+            yield from iter_archive_pdfs(path, upload_dir, MAX_BATCH_BYTES)
+            os.remove(path)
+        else:
+            yield path, filename
+
+
+def evaluate_batch_blocks(parsed: list, use_memo: bool, diagnostics: bool) -> tuple[list, dict, list]:
+    """
+    Stage 1 over the parsed PDFs: (stage1_results, new_memos, feature_rows).
+    Runs in the threadpool; it is CPU-bound and waits on the block cache.
+    """
+    # Blocks are evaluated one at a time so a rejected block's scan can be
+    # dropped straight away; only ?diagnostics=1 keeps rejected blocks.
+    # Results of blocks seen in earlier runs come from the block cache
+    # (diagnostics runs always re-evaluate, they need the full trace).
+    # A block repeated in the batch (overlapping compilations) is evaluated
+    # and refined once; its row counts the PDFs it was seen in.
+    stage1_results = []
+    new_memos = {}  # key -> memo for blocks not cached yet
+    feature_rows = []  # every block's features, for /rescore
+    batch_sources = {}  # fingerprint -> PDFs the block appeared in
+    batch_experience = {}  # fingerprint -> experience of its first copy
+    for result in parsed:
+        # Empty, unreadable or over-budget files have no blocks
+        fingerprints = [block_fingerprint(text) for text in result["blocks"]]
+        repeats = []
+        for fingerprint in fingerprints:
+            repeats.append(fingerprint in batch_sources)
+            batch_sources.setdefault(fingerprint, set()).add(result["filename"])
+
+        keys = {idx: block_memo_key(text)
+                for idx, (text, repeat) in enumerate(zip(result["blocks"], repeats), 1)
+                if not repeat} if use_memo else {}
+        memos = BLOCK_CACHE.get_many(list(keys.values())) if use_memo else {}
+
+        for idx, block_text in enumerate(result["blocks"], 1):
+            fingerprint = fingerprints[idx - 1]
+            if repeats[idx - 1]:
+                if FEATURE_STORE.enabled:
+                    feature_rows.append(
+                        (result["filename"], idx, block_text, 0, 0, *batch_experience[fingerprint]))
+                continue
+
+            key = keys.get(idx)
+            memo = memos.get(key)
+            if memo is not None:
+                count_cached_evaluation(memo["rule_code"])
+                exp_min, exp_max = memo["experience"]
+                batch_experience[fingerprint] = (exp_min, exp_max)
+                if FEATURE_STORE.enabled:
+                    feature_rows.append(
+                        (result["filename"], idx, block_text, 0, 0, exp_min, exp_max))
+                if memo["status"] != "Selected":
+                    continue
+                stage1_results.append({
+                    "Source_PDF": result["filename"],
+                    "Block_ID": idx,
+                    "Exp_Min": exp_min,
+                    "Exp_Max": exp_max,
+                    "Raw_Text": block_text,
+                    "Seen_In": batch_sources[fingerprint],
+                    "Refined_Fields": memo["fields"],
+                    "status": memo["status"],
+                    "rule_code": memo["rule_code"],
+                    "rule_args": memo["rule_args"],
+                })
+                continue
+
+            # One keyword scan per block, shared by the rules and the refiner.
+            # Experience is parsed lazily, only for blocks that reach that rule.
+            block = BlockFeatures(block_text, scan_block(block_text))
+            evaluation = evaluate_block(block, diagnostics)
+
+            exp_min, exp_max = block.parsed_experience
+            batch_experience[fingerprint] = (exp_min, exp_max)
+            if FEATURE_STORE.enabled:
+                feature_rows.append(
+                    (result["filename"], idx, block_text, *block.hits.to_masks(), exp_min, exp_max))
+            job_entry = {
+                "Source_PDF": result["filename"],
+                "Block_ID": idx,
+                "Exp_Min": exp_min,
+                "Exp_Max": exp_max,
+                "Raw_Text": block_text,
+                "Seen_In": batch_sources[fingerprint],
+                "Keyword_Hits": block.hits,
+                **evaluation
+            }
+            if use_memo:
+                job_entry["Memo_Key"] = key
+                if evaluation["status"] != "Selected":
+                    new_memos[key] = block_memo(job_entry)
+            if evaluation["status"] != "Selected" and not diagnostics:
+                continue
+            stage1_results.append(job_entry)
+
+    return stage1_results, new_memos, feature_rows
+
+
+def refine_selected(stage1_results: list, new_memos: dict, use_memo: bool) -> tuple[list, list]:
+    """
+    Stage 2: (refined rows, the selected stage1_results they came from), in
+    order. Newly selected blocks' refined columns are added to new_memos,
+    which is then written to the block cache. Runs in the threadpool.
+    """
+    refined_batch = refine_job_batch(stage1_results)
+
+    # refine_job_batch keeps the selected jobs, in order
+    selected = [job for job in stage1_results if job["status"] == "Selected"]
+
+    # Remember the refined columns of newly selected blocks
+    if use_memo:
+        for job, entry in zip(selected, refined_batch):
+            if "Memo_Key" in job:
+                fields = {name: entry[name] for name in BLOCK_FIELDS}
+                new_memos[job["Memo_Key"]] = block_memo(job, fields)
+        BLOCK_CACHE.set_many(new_memos)
+
+    return refined_batch, selected
+
+
+def stage1_diagnostics_df(stage1_results: list) -> pd.DataFrame:
+    """
+    Stage-1 diagnostics for every block of the batch (?diagnostics=1),
+    with reasons and debug logs rendered from the rule codes.
+    """
+    rows = []
+    for job in stage1_results:
+        reason, logs = describe_evaluation(job)
+        rows.append({
+            "Source_PDF": job["Source_PDF"],
+            "Block_ID": job["Block_ID"],
+            "Exp_Min": job["Exp_Min"],
+            "Exp_Max": job["Exp_Max"],
+            "Raw_Text": job["Raw_Text"],
+            "status": job["status"],
+            "reason": reason,
+            "debug_log": " | ".join(logs),
+        })
+    return pd.DataFrame(rows)
+
+
+def parse_report_headers(parsed: list) -> dict:
+    """
+    Per-file parse timings, plus the files skipped for running over budget or failing.
+    Filenames are URL-quoted to keep the headers ASCII-safe.
+    """
+    headers = {
+        "X-Parse-Timings": "; ".join(
+            f"{quote(r['filename'])}={r['seconds']:.2f}s" for r in parsed)
+    }
+    skipped = [r for r in parsed if r["status"] in ("timeout", "memory", "error")]
+    if skipped:
+        headers["X-Parse-Skipped"] = "; ".join(
+            f"{quote(r['filename'])}={r['status']} after {r['seconds']:.2f}s" for r in skipped)
+    return headers
@@ -0,0 +1,210 @@
+# app/master_store.py
+import json
+import os
+import sqlite3
+import time
+import numpy as np
+import pandas as pd
+from app.config import MASTER_STORE_PATH, NEAR_DUP_THRESHOLD
+from app.dedup import (
+    DEDUP_INDEX_VERSION, KEY_COLUMNS, KeyIndex, append_new_jobs, get_start_sno, job_key, key_digest
+)
+from app.near_dup import SIGNATURE_COLUMNS, flag_near_duplicates
+
+# SQLite integers are signed; key digests are stored shifted into that range
+_DIGEST_OFFSET = 1 << 63
+
+_INSERT = "INSERT INTO jobs (sno, dedup_key, data, signature, created, key_values) VALUES (?, ?, ?, ?, ?, ?)"
+
+
+def _stored_digest(digest: int) -> int:
+    return digest - _DIGEST_OFFSET
+
+
+def _key_values(job: dict) -> str:
+    """
+    The key cells as job_key reads them (str of the raw value), kept next to
+    the row: its JSON data can't tell an empty tracker cell (keyed "nan")
+    from a job's None (keyed "none").
+    """
+    return json.dumps([str(job.get(col, "")) for col in KEY_COLUMNS])
+
+
+class MasterStore:
+    """
+    Server-side master tracker: one row per job (its tracker columns as
+    JSON), indexed by S.No and by dedup key digest (see app/dedup.py), with
+    the key cells the digest came from and its MinHash signature. Each
+    append deduplicates, numbers and inserts a batch inside one BEGIN
+    IMMEDIATE transaction, so concurrent requests queue up instead of
+    handing out the same S.No or inserting one job twice.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Autocommit mode; transactions are opened explicitly
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                sno INTEGER PRIMARY KEY, dedup_key INTEGER NOT NULL,
+                data TEXT NOT NULL, signature TEXT, created REAL NOT NULL,
+                key_values TEXT);
+            CREATE INDEX IF NOT EXISTS jobs_dedup_key ON jobs (dedup_key);
+        """)
+        # Stores created before key_values was kept; their rows rekey from data
+        if "key_values" not in {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}:
+            conn.execute("ALTER TABLE jobs ADD COLUMN key_values TEXT")
+        if conn.execute("PRAGMA user_version").fetchone()[0] != DEDUP_INDEX_VERSION:
+            self._rekey(conn)
+        return conn
+
+    def _rekey(self, conn: sqlite3.Connection) -> None:
+        """Recomputes the stored key digests after the key normalization changed."""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute("SELECT sno, key_values, data FROM jobs").fetchall()
+            conn.executemany("UPDATE jobs SET dedup_key = ? WHERE sno = ?", [
+                (_stored_digest(key_digest(job_key(
+                    dict(zip(KEY_COLUMNS, json.loads(values))) if values else json.loads(data)))), sno)
+                for sno, values, data in rows])
+            conn.execute(f"PRAGMA user_version = {DEDUP_INDEX_VERSION}")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def append_jobs(self, refined_batch: list, texts: list) -> tuple[list, pd.DataFrame]:
+        """
+        append_new_jobs and flag_near_duplicates against the stored master
+        (texts are the refined jobs' block texts), then stores the new jobs.
+        Returns (new jobs, their signature rows). Raises sqlite3.Error.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Only the batch's own keys are looked up, through the index
+                digests = {_stored_digest(key_digest(job_key(job))) for job in refined_batch}
+                stored = _select_in(conn, "SELECT dedup_key FROM jobs WHERE dedup_key IN ({})", list(digests))
+                existing_keys = KeyIndex(
+                    np.array([digest + _DIGEST_OFFSET for (digest,) in stored], np.uint64))
+                start_sno = (conn.execute("SELECT MAX(sno) FROM jobs").fetchone()[0] or 0) + 1
+
+                text_of = {id(job): text for job, text in zip(refined_batch, texts)}
+                new_jobs = append_new_jobs(refined_batch, existing_keys, start_sno)
+                previous_signatures = None
+                if NEAR_DUP_THRESHOLD and new_jobs:
+                    previous_signatures = self._signatures(conn)
+                signatures_df = flag_near_duplicates(
+                    new_jobs, [text_of[id(job)] for job in new_jobs], previous_signatures)
+                if previous_signatures is not None:
+                    signatures_df = signatures_df.iloc[len(previous_signatures):].reset_index(drop=True)
+
+                signature_of = dict(zip(signatures_df["S.No"], signatures_df["Signature"]))
+                now = time.time()
+                conn.executemany(_INSERT, [
+                    (job["S.No"], _stored_digest(key_digest(job_key(job))),
+                     json.dumps(job, default=str), signature_of.get(str(job["S.No"])), now,
+                     _key_values(job))
+                    for job in new_jobs])
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+        return new_jobs, signatures_df
+
+    def import_tracker(self, df: pd.DataFrame, signatures_df: pd.DataFrame) -> int:
+        """
+        Adds the rows of an uploaded tracker (see load_previous_df and
+        load_signatures) whose key isn't stored yet. Rows keep their S.No
+        unless it is missing or taken, in which case they are numbered after
+        the highest one. Returns the number of rows added. Raises sqlite3.Error.
+        """
+        if df.empty:
+            return 0
+        # Keys as get_existing_keys takes them (an empty cell reads "nan");
+        # the stored JSON gets None for empty cells and plain Python scalars
+        records = df.to_dict("records")
+        keys = [job_key(record) for record in records]
+        key_values = [_key_values(record) for record in records]
+        rows = df.astype(object).where(df.notna(), None).to_dict("records")
+        signature_of = dict(zip(signatures_df["S.No"], signatures_df["Signature"]))
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing_keys = KeyIndex(np.array(
+                    [digest + _DIGEST_OFFSET for (digest,) in conn.execute("SELECT dedup_key FROM jobs")],
+                    np.uint64))
+                taken = {sno for (sno,) in conn.execute("SELECT sno FROM jobs")}
+                next_sno = max(taken | {get_start_sno(df) - 1}) + 1
+
+                inserts = []
+                now = time.time()
+                for key, values, row in zip(keys, key_values, rows):
+                    if key in existing_keys:
+                        continue
+                    existing_keys.add(key)
+                    sno = pd.to_numeric(row.get("S.No"), errors="coerce")
+                    signature = None
+                    if pd.notna(sno) and np.isfinite(sno) and sno == int(sno) and sno >= 1:
+                        sno = int(sno)
+                        signature = signature_of.get(str(sno))
+                    if not isinstance(sno, int) or sno in taken:
+                        sno = next_sno
+                        next_sno += 1
+                    taken.add(sno)
+                    row["S.No"] = sno
+                    inserts.append((sno, _stored_digest(key_digest(key)),
+                                    json.dumps(row, default=str), signature, now, values))
+                conn.executemany(_INSERT, inserts)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+        return len(inserts)
+
+    def export(self) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """(master rows in S.No order, signature rows) for generate_master_excel. Raises sqlite3.Error."""
+        conn = self._connect()
+        try:
+            # One read transaction, so both come from the same state
+            conn.execute("BEGIN")
+            master_df = pd.DataFrame(
+                [json.loads(data) for (data,) in conn.execute("SELECT data FROM jobs ORDER BY sno")])
+            signatures_df = self._signatures(conn)
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return master_df, signatures_df
+
+    @staticmethod
+    def _signatures(conn: sqlite3.Connection) -> pd.DataFrame:
+        rows = conn.execute(
+            "SELECT CAST(sno AS TEXT), signature FROM jobs WHERE signature IS NOT NULL ORDER BY sno")
+        return pd.DataFrame(rows.fetchall(), columns=SIGNATURE_COLUMNS)
+
+
+def _select_in(conn: sqlite3.Connection, query: str, values: list) -> list:
+    """Runs query with its IN (...) filled in, 500 values at a time."""
+    rows = []
+    for i in range(0, len(values), 500):
+        chunk = values[i:i + 500]
+        rows += conn.execute(query.format(",".join("?" * len(chunk))), chunk).fetchall()
+    return rows
+
+
+MASTER_STORE = MasterStore(MASTER_STORE_PATH)
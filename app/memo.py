@@ -0,0 +1,66 @@
+# app/memo.py
+import hashlib
+import app.config
+import app.experience_parser
+import app.refiner
+import app.rules
+import app.scanner
+from app.cache import SqliteCache
+from app.config import BLOCK_CACHE_MAX_BYTES, BLOCK_CACHE_MAX_AGE_DAYS
+
+BLOCK_CACHE = SqliteCache(
+    "blocks", BLOCK_CACHE_MAX_BYTES, BLOCK_CACHE_MAX_AGE_DAYS * 24 * 3600)
+
+
+def _source_fingerprint(modules) -> str:
+    """
+    Hash of the source files that decide a block's results, so editing the
+    config, rules, scanner, experience parser or refiner invalidates the cache.
+    """
+    digest = hashlib.sha256()
+    for module in modules:
+        with open(module.__file__, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+RULES_FINGERPRINT = _source_fingerprint([
+    app.config, app.scanner, app.experience_parser, app.rules, app.refiner
+])
+
+
+def block_memo_key(text: str) -> str:
+    """
+    Cache key for a block's Stage-1 and refinement results. Blocks come out
+    of the splitter already stripped; any further normalisation (case,
+    whitespace) would merge blocks the rules treat differently.
+    """
+    digest = hashlib.sha256(RULES_FINGERPRINT.encode())
+    digest.update(text.encode("utf-8", "surrogatepass"))
+    return digest.hexdigest()
+
+
+def block_fingerprint(text: str) -> bytes:
+    """
+    Identifies repeats of a block within one batch; repeats reuse the first
+    copy's results rather than being re-evaluated. Like block_memo_key it
+    covers the exact (already stripped) text: a copy re-flowed by another
+    compilation can read differently to the rules (e.g. "walk in" vs
+    "walk\nin"), so it is evaluated on its own.
+    """
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+def block_memo(job: dict, fields: dict = None) -> dict:
+    """
+    What is cached for a block: its evaluation, the experience the rules
+    parsed and, for selected blocks, the refine_job columns. Per-run values
+    (S.No, Source_PDF, Last Updated) are never stored.
+    """
+    return {
+        "status": job["status"],
+        "rule_code": job["rule_code"],
+        "rule_args": job["rule_args"],
+        "experience": (job["Exp_Min"], job["Exp_Max"]),
+        "fields": fields,
+    }
@@ -0,0 +1,207 @@
+# app/near_dup.py
+import base64
+import io
+import re
+import zlib
+from typing import Optional
+import numpy as np
+import pandas as pd
+from app.config import (
+    NEAR_DUP_THRESHOLD, NEAR_DUP_SHINGLE_WORDS, NEAR_DUP_NUM_PERM, NEAR_DUP_BANDS
+)
+from app.xlsx_reader import read_sheet
+
+# Hidden sheet of the master tracker holding each row's signature
+SIGNATURE_SHEET = "MinHash"
+SIGNATURE_COLUMNS = ["S.No", "Signature"]
+
+FLAG_COLUMN = "Possible Duplicate Of"
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Fixed seed: signatures are stored in the tracker and compared across runs
+_rng = np.random.default_rng(20240601)
+_MULTIPLIERS = _rng.integers(1, 2**64, NEAR_DUP_NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_OFFSETS = _rng.integers(0, 2**64, NEAR_DUP_NUM_PERM, dtype=np.uint64)
+# Combine consecutive word hashes into a shingle hash
+_SHINGLE_MIXERS = _rng.integers(1, 2**64, NEAR_DUP_SHINGLE_WORDS, dtype=np.uint64) | np.uint64(1)
+# Fold a band's values (and the band number) into one bucket key;
+# collisions only add candidates, which are verified anyway
+_BAND_MIXERS = _rng.integers(1, 2**64, NEAR_DUP_NUM_PERM // NEAR_DUP_BANDS, dtype=np.uint64) | np.uint64(1)
+_BAND_OFFSETS = _rng.integers(0, 2**64, NEAR_DUP_BANDS, dtype=np.uint64)
+
+
+def minhash(text: str) -> Optional[np.ndarray]:
+    """
+    MinHash signature (NEAR_DUP_NUM_PERM uint32 values) of a block's word
+    shingles, or None for a block without words.
+    """
+    words = WORD_PATTERN.findall(text.lower())
+    if not words:
+        return None
+    word_hashes = np.fromiter((zlib.crc32(w.encode()) for w in words), np.uint64, len(words))
+    k = min(NEAR_DUP_SHINGLE_WORDS, len(words))
+    n = len(words) - k + 1
+    # uint64 arithmetic wraps; that is the hashing
+    x = np.zeros(n, np.uint64)
+    for j in range(k):
+        x += word_hashes[j:j + n] * _SHINGLE_MIXERS[j]
+    x = np.unique(x)
+    # Multiply-shift hashing, keeping the high 32 bits
+    hashed = (_MULTIPLIERS[:, None] * x[None, :] + _OFFSETS[:, None]) >> np.uint64(32)
+    return hashed.min(axis=1).astype(np.uint32)
+
+
+def encode_signature(signature: np.ndarray) -> str:
+    return base64.b64encode(signature.astype("<u4").tobytes()).decode("ascii")
+
+
+def decode_signature(value: str) -> Optional[np.ndarray]:
+    try:
+        signature = np.frombuffer(base64.b64decode(value), dtype="<u4")
+    except (ValueError, TypeError):
+        return None
+    return signature if len(signature) == NEAR_DUP_NUM_PERM else None
+
+
+class NearDuplicateIndex:
+    """
+    Locality-sensitive hashing over MinHash signatures. Each signature is cut
+    into NEAR_DUP_BANDS bands; rows sharing any band are candidates, and a
+    candidate matches when the share of equal signature values (the Jaccard
+    estimate) reaches the threshold.
+    Rows loaded with add_many sit in one sorted array of bucket keys (built
+    with a NumPy sort, probed with one vectorized binary search); rows added
+    one at a time during a batch go to a small dict. Lookup cost barely grows
+    with the number of rows.
+    """
+
+    def __init__(self, threshold: float = NEAR_DUP_THRESHOLD):
+        self.threshold = threshold
+        self._ids = np.empty(0, dtype=object)
+        self._signatures = np.empty((0, NEAR_DUP_NUM_PERM), np.uint32)
+        self._sorted_keys = np.empty(0, np.uint64)
+        self._sorted_rows = np.empty(0, np.intp)
+        self._pending = {}
+        self._pending_signatures = {}
+
+    def __len__(self) -> int:
+        return len(self._ids) + len(self._pending_signatures)
+
+    @staticmethod
+    def _band_keys(signatures: np.ndarray) -> np.ndarray:
+        """(rows, bands) bucket keys of an (rows, NEAR_DUP_NUM_PERM) matrix."""
+        bands = signatures.reshape(len(signatures), NEAR_DUP_BANDS, -1).astype(np.uint64)
+        return (bands * _BAND_MIXERS).sum(axis=2) + _BAND_OFFSETS
+
+    def add_many(self, ids: list, signatures: np.ndarray) -> None:
+        """Bulk-loads rows (e.g. a master's stored signatures); re-sorts the band arrays."""
+        if not len(ids):
+            return
+        self._ids = np.concatenate([self._ids, np.array(ids, dtype=object)])
+        self._signatures = np.vstack([self._signatures, signatures])
+        keys = self._band_keys(self._signatures).ravel()
+        order = np.argsort(keys)
+        self._sorted_keys = keys[order]
+        self._sorted_rows = order // NEAR_DUP_BANDS
+
+    def add(self, row_id, signature: np.ndarray) -> None:
+        for key in self._band_keys(signature[None, :])[0].tolist():
+            self._pending.setdefault(key, []).append(row_id)
+        self._pending_signatures[row_id] = signature
+
+    def query(self, signature: np.ndarray) -> Optional[tuple]:
+        """
+        (row_id, similarity) of the most similar indexed row at or above the
+        threshold; on a tie, the row with the lowest S.No.
+        """
+        keys = self._band_keys(signature[None, :])[0]
+        starts = np.searchsorted(self._sorted_keys, keys, "left")
+        ends = np.searchsorted(self._sorted_keys, keys, "right")
+        rows = set()
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            if end > start:
+                rows.update(self._sorted_rows[start:end].tolist())
+        candidates = set()
+        for key in keys.tolist():
+            candidates.update(self._pending.get(key, ()))
+
+        # Candidates come out of sets, so they are put in S.No order before
+        # the strict ">" below keeps the first of equally similar rows
+        scored = [(self._ids[row], self._signatures[row]) for row in sorted(rows)]
+        scored += [(row_id, self._pending_signatures[row_id]) for row_id in candidates]
+        scored.sort(key=lambda item: _sno_order(item[0]))
+        best = None
+        for row_id, other in scored:
+            similarity = float(np.count_nonzero(other == signature)) / len(signature)
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (row_id, similarity)
+        return best
+
+
+def _sno_order(row_id) -> tuple:
+    """Sort key for row ids (S.No text): numbers first, ascending, then any other text."""
+    try:
+        return 0, float(row_id), ""
+    except (TypeError, ValueError):
+        return 1, 0.0, str(row_id)
+
+
+def load_signatures(source) -> pd.DataFrame:
+    """
+    Reads the hidden signature sheet of a previous master (path or raw bytes).
+    Trackers written before signatures were stored have none; their rows are
+    simply not checked against.
+    """
+    try:
+        df = read_sheet(source if isinstance(source, str) else io.BytesIO(source),
+                        SIGNATURE_SHEET, dtype=str)
+    except Exception:
+        return pd.DataFrame(columns=SIGNATURE_COLUMNS)
+    if list(df.columns) != SIGNATURE_COLUMNS:
+        return pd.DataFrame(columns=SIGNATURE_COLUMNS)
+    return df.dropna()
+
+
+def build_index(signatures_df: pd.DataFrame) -> NearDuplicateIndex:
+    index = NearDuplicateIndex()
+    ids, rows = [], []
+    for sno, value in zip(signatures_df["S.No"], signatures_df["Signature"]):
+        signature = decode_signature(value)
+        if signature is not None:
+            ids.append(sno)
+            rows.append(signature)
+    if rows:
+        index.add_many(ids, np.vstack(rows))
+    return index
+
+
+def flag_near_duplicates(jobs: list, texts: list, previous_signatures: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Sets FLAG_COLUMN on each new job (already numbered) whose text nearly
+    matches a master row or an earlier job of the batch, e.g. "S.No 12 (88%)".
+    Returns the signature sheet for the merged tracker: the previous rows'
+    signatures followed by the new jobs'.
+    """
+    if previous_signatures is None:
+        previous_signatures = pd.DataFrame(columns=SIGNATURE_COLUMNS)
+    if not NEAR_DUP_THRESHOLD or not jobs:
+        return previous_signatures
+
+    index = build_index(previous_signatures)
+    new_rows = []
+    for job, text in zip(jobs, texts):
+        job[FLAG_COLUMN] = ""
+        signature = minhash(text or "")
+        if signature is None:
+            continue
+        match = index.query(signature)
+        if match is not None:
+            job[FLAG_COLUMN] = f"S.No {match[0]} ({match[1]:.0%})"
+        index.add(str(job["S.No"]), signature)
+        new_rows.append({"S.No": str(job["S.No"]), "Signature": encode_signature(signature)})
+
+    new_signatures = pd.DataFrame(new_rows, columns=SIGNATURE_COLUMNS)
+    if previous_signatures.empty:
+        return new_signatures
+    return pd.concat([previous_signatures, new_signatures], ignore_index=True)
@@ -48,36 +48,349 @@
 
 # app/parser.py
 import pdfplumber
+import hashlib
 import io
 import re
+import time
+from concurrent.futures import Future, as_completed
+from typing import Iterable, Iterator, Union
+from pdfminer.converter import TextConverter
+from pdfminer.layout import LAParams
+from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+from pdfminer.pdfpage import PDFPage
+from app.cache import DiskCache
+from app.workers import WorkerBudgetExceeded
+from app.config import (
+    PDF_SHARD_PAGE_THRESHOLD, PDF_SHARD_PAGES, PDF_CACHE_MAX_BYTES, PDF_TEXT_BACKEND
+)
 
+# Bump whenever extraction or splitting changes so cached block lists are not reused
+PARSER_VERSION = 2
 
-def extract_blocks_from_pdf(file_bytes: bytes, filename: str) -> list[str]:
+# Entries are {"blocks": [...], "pages": n}: plain data, so they are stored
+# as JSON rather than pickled
+PDF_CACHE = DiskCache("pdf_blocks", PDF_CACHE_MAX_BYTES, use_json=True)
+
+# PDFs are passed around as a file path (spooled uploads) or raw bytes.
+# Paths keep uploads out of Python memory and are cheap to send to workers.
+PdfSource = Union[str, bytes]
+
+# Delimiters: 3+ equals, dashes, or underscores (e.g., ===, ---, ___)
+DELIMITER_PATTERN = re.compile(r'\n\s*[=\-_]{3,}\s*\n')
+ONLY_WHITESPACE_LEFT = re.compile(r'\s*\Z')
+LEAN_LINE_BREAKS = re.compile(r'[ \t]*\n(?:[ \t]*\n)*')
+
+
+def extract_blocks_from_pdf(source: PdfSource, filename: str, backend: str = None) -> list[str]:
     """
     Splits PDF text into logical job blocks using visual delimiters.
+    Results are cached by content hash, so re-uploads skip extraction.
+    """
+    return extract_blocks_from_pdfs([(source, filename)], backend=backend)[0]["blocks"]
+
+
+def iter_blocks_from_pdf(source: PdfSource, backend: str = None) -> Iterator[str]:
+    """
+    Yields job blocks while the PDF is read, one page at a time.
+    Raises on unreadable PDFs (possibly after some blocks were yielded).
+    """
+    yield from iter_blocks(iter_page_texts(source, backend=backend))
+
+
+def pdf_cache_key(source: PdfSource, backend: str) -> str:
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            digest = hashlib.file_digest(f, "sha256").hexdigest()
+    else:
+        digest = hashlib.sha256(source).hexdigest()
+    return f"{digest}-{backend}-v{PARSER_VERSION}"
+
+
+def _open_pdf(source: PdfSource):
+    """
+    Returns something pdfplumber/pdfminer can read: the path itself or a file
+    object over raw bytes.
+    """
+    return source if isinstance(source, str) else io.BytesIO(source)
+
+
+# --- TEXT EXTRACTION BACKENDS ---
+# Each backend yields (page_index, text) for pages[start:stop].
+
+def _pdfplumber_pages(source: PdfSource, start: int, stop: int) -> Iterator[tuple[int, str]]:
+    with pdfplumber.open(_open_pdf(source)) as pdf:
+        for index, page in enumerate(pdf.pages[start:stop], start):
+            extracted = page.extract_text()
+            # Drop the page's cached layout objects before moving on
+            page.close()
+            yield index, extracted
+
+
+def _lean_pages(source: PdfSource, start: int, stop: int) -> Iterator[tuple[int, str]]:
+    """
+    Plain text straight from pdfminer's TextConverter, skipping the char/word
+    objects pdfplumber builds for every page.
     """
-    full_text = ""
+    rsrcmgr = PDFResourceManager(caching=True)
+    output = io.StringIO()
+    device = TextConverter(rsrcmgr, output, laparams=LAParams())
+    interpreter = PDFPageInterpreter(rsrcmgr, device)
+    fp = open(source, "rb") if isinstance(source, str) else io.BytesIO(source)
     try:
-        with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
-            text_pages = []
-            for page in pdf.pages:
-                extracted = page.extract_text()
+        for index, page in enumerate(PDFPage.get_pages(fp)):
+            if index < start:
+                continue
+            if stop is not None and index >= stop:
+                break
+            interpreter.process_page(page)
+            text = output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+            # Match pdfplumber's shape: no trailing spaces, no blank lines
+            # between text boxes, no form feed
+            yield index, LEAN_LINE_BREAKS.sub("\n", text).strip(" \t\n\x0c")
+    finally:
+        device.close()
+        fp.close()
+
+
+TEXT_BACKENDS = {
+    "pdfplumber": _pdfplumber_pages,
+    "lean": _lean_pages,
+}
+
+
+def iter_page_texts(source: PdfSource, start: int = 0, stop: int = None,
+                    backend: str = None) -> Iterator[str]:
+    """
+    Yields the non-empty page texts of pages[start:stop], in page order.
+    The lean backend falls back to pdfplumber if it fails or finds no text.
+    Raises on unreadable PDFs so callers decide how to report the failure.
+    """
+    backend = backend or PDF_TEXT_BACKEND
+
+    if backend != "pdfplumber":
+        resume_at, found_text = start, False
+        try:
+            for index, extracted in TEXT_BACKENDS[backend](source, start, stop):
+                resume_at = index + 1
                 if extracted:
-                    text_pages.append(extracted)
-            full_text = "\n".join(text_pages)
-    except Exception as e:
-        print(f"[ERROR] Failed to parse {filename}: {e}")
-        return []
+                    found_text = True
+                    yield extracted
+        except Exception as e:
+            print(f"[WARN] {backend} extraction failed at page {resume_at + 1}, "
+                  f"falling back to pdfplumber: {e}")
+            start = resume_at
+        else:
+            if found_text:
+                return
+            # No text at all usually means the lean path missed the text layer
+
+    for _, extracted in _pdfplumber_pages(source, start, stop):
+        if extracted:
+            yield extracted
 
-    if not full_text.strip():
-        return []
 
-    # Delimiters: 3+ equals, dashes, or underscores (e.g., ===, ---, ___)
-    delimiter_pattern = r'\n\s*[=\-_]{3,}\s*\n'
+def extract_page_texts(source: PdfSource, start: int = 0, stop: int = None,
+                       backend: str = None) -> list[str]:
+    return list(iter_page_texts(source, start, stop, backend))
+
+
+def count_pages(source: PdfSource) -> int:
+    """
+    Returns the page count, or 0 if the PDF cannot be opened.
+    """
+    try:
+        with pdfplumber.open(_open_pdf(source)) as pdf:
+            return len(pdf.pages)
+    except Exception:
+        return 0
+
+
+def iter_blocks(text_pages: Iterable[str]) -> Iterator[str]:
+    """
+    Streams job blocks out of page texts as soon as their closing delimiter is seen.
+    Only the unfinished tail is carried across pages; the output is identical to
+    splitting the newline-joined text of all pages in one go.
+    """
+    tail = ""
+    started = False
+
+    for text in text_pages:
+        # Empty pages are not skipped: joined, they still add a newline that
+        # can complete a delimiter.
 
-    blocks = re.split(delimiter_pattern, full_text)
+        # Earlier text can only start a delimiter inside its trailing run of
+        # whitespace/delimiter characters, so rescanning starts there.
+        scan_from = _trailing_delimiter_run(tail)
+        tail = f"{tail}\n{text}" if started else text
+        started = True
 
+        block_start = 0
+        for m in DELIMITER_PATTERN.finditer(tail, scan_from):
+            # A delimiter followed only by whitespace may still grow with the
+            # next page; wait for more text before cutting there.
+            if ONLY_WHITESPACE_LEFT.match(tail, m.end()):
+                break
+            block = tail[block_start:m.start()].strip()
+            if len(block) > 50:
+                yield block
+            block_start = m.end()
+
+        tail = tail[block_start:]
+
+    # No more text can follow: cut at any delimiters still pending in the tail.
     # Filter noise (blocks too short to be a JD)
-    valid_blocks = [b.strip() for b in blocks if len(b.strip()) > 50]
+    for block in DELIMITER_PATTERN.split(tail):
+        block = block.strip()
+        if len(block) > 50:
+            yield block
+
+
+def _trailing_delimiter_run(text: str) -> int:
+    """
+    Returns where the trailing run of whitespace/delimiter characters starts.
+    """
+    i = len(text)
+    while i > 0 and (text[i - 1].isspace() or text[i - 1] in "=-_"):
+        i -= 1
+    return i
+
+
+def split_blocks(text_pages: Iterable[str]) -> list[str]:
+    """
+    Stitches page texts back together and splits them into job blocks.
+    Splitting happens after stitching so a block spanning pages stays whole.
+    """
+    return list(iter_blocks(text_pages))
+
+
+def plan_page_shards(page_count: int) -> list[tuple[int, int]]:
+    """
+    Splits a large PDF into (start, stop) page ranges for parallel extraction.
+    PDFs at or below PDF_SHARD_PAGE_THRESHOLD are parsed as a single range.
+    """
+    if not PDF_SHARD_PAGE_THRESHOLD or page_count <= PDF_SHARD_PAGE_THRESHOLD:
+        return [(0, None)]
+
+    return [(start, min(start + PDF_SHARD_PAGES, page_count))
+            for start in range(0, page_count, PDF_SHARD_PAGES)]
+
+
+def _timed_parse(source: PdfSource, backend: str, shard_threshold: int) -> dict:
+    """
+    Worker entry point for a whole PDF: {"pages", "blocks", "seconds"}.
+    The page count is taken here, inside the worker's budget. Blocks are split
+    as the pages are read, so only they cross back to the caller; a PDF over
+    shard_threshold pages (0 = never) comes back with blocks None, to be
+    sharded by the caller.
+    """
+    began = time.monotonic()
+    page_count = count_pages(source)
+    blocks = None
+    if not shard_threshold or page_count <= shard_threshold:
+        blocks = list(iter_blocks_from_pdf(source, backend))
+    return {"pages": page_count, "blocks": blocks, "seconds": time.monotonic() - began}
+
+
+def _timed_extract(source: PdfSource, start: int, stop: int, backend: str) -> tuple[list[str], float]:
+    """
+    Worker entry point for one shard: page texts of the range plus the seconds it took.
+    """
+    began = time.monotonic()
+    text_pages = extract_page_texts(source, start, stop, backend)
+    return text_pages, time.monotonic() - began
+
+
+def _run_inline(fn, *args) -> Future:
+    """
+    Runs fn in this process and wraps the outcome in a finished Future,
+    so the serial path shares the pooled path's result handling.
+    """
+    future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def extract_blocks_from_pdfs(pdfs: list[tuple[PdfSource, str]], executor=None,
+                             backend: str = None) -> list[dict]:
+    """
+    Parses several PDFs, one per worker when an executor is given.
+    Large PDFs are further split into page ranges (see plan_page_shards),
+    planned from the page count their first worker task reports.
+    Results are returned in input order so Block_ID numbering stays deterministic.
+
+    Each result is {"filename", "blocks", "pages", "status", "seconds"}; status
+    is "ok", "cached", "error", or "timeout"/"memory" when a budgeted worker
+    (app.workers.BudgetedProcessPool) stopped the file. Failed files have no
+    blocks, and 0 pages unless the count was taken before they failed.
+    """
+    backend = backend or PDF_TEXT_BACKEND
+
+    # Every uncached file goes to a worker whole, up front so all workers stay busy
+    planned = []
+    for source, filename in pdfs:
+        key = pdf_cache_key(source, backend)
+        cached = PDF_CACHE.get(key)
+        if cached is not None:
+            planned.append((filename, key, source, cached, None, []))
+            continue
+
+        if executor is None:
+            first = _run_inline(_timed_parse, source, backend, 0)
+        else:
+            first = executor.submit(_timed_parse, source, backend, PDF_SHARD_PAGE_THRESHOLD)
+        planned.append((filename, key, source, None, first, []))
+
+    # Files too long for one worker are sharded as soon as their page count is in
+    pending = {first: (source, shards) for _, _, source, _, first, shards in planned if first is not None}
+    for future in as_completed(pending):
+        if future.exception() is None and future.result()["blocks"] is None:
+            source, shards = pending[future]
+            shards.extend(executor.submit(_timed_extract, source, start, stop, backend)
+                          for start, stop in plan_page_shards(future.result()["pages"]))
+
+    results = []
+    for filename, key, _, cached, first, shards in planned:
+        if cached is not None:
+            results.append({"filename": filename, "blocks": cached["blocks"], "pages": cached["pages"],
+                            "status": "cached", "seconds": 0.0})
+            continue
+
+        pages, seconds = 0, 0.0
+        try:
+            parsed = first.result()
+            pages, blocks = parsed["pages"], parsed["blocks"]
+            seconds += parsed["seconds"]
+            # Shard texts are stitched before splitting so a block spanning
+            # two ranges stays whole
+            text_pages = []
+            for future in shards:
+                shard_pages, shard_seconds = future.result()
+                text_pages.extend(shard_pages)
+                seconds += shard_seconds
+        except WorkerBudgetExceeded as e:
+            print(f"[WARN] Skipped {filename}: {e}")
+            seconds += e.elapsed
+            for future in shards:
+                future.cancel()
+            results.append({"filename": filename, "blocks": [], "pages": pages,
+                            "status": e.kind, "seconds": seconds})
+            continue
+        except Exception as e:
+            print(f"[ERROR] Failed to parse {filename}: {e}")
+            for future in shards:
+                future.cancel()
+            results.append({"filename": filename, "blocks": [], "pages": pages,
+                            "status": "error", "seconds": seconds})
+            continue
 
-    return valid_blocks
+        if blocks is None:
+            blocks = split_blocks(text_pages)
+        PDF_CACHE.set(key, {"blocks": blocks, "pages": pages})
+        results.append({"filename": filename, "blocks": blocks, "pages": pages,
+                        "status": "ok", "seconds": seconds})
+    return results
@@ -1,10 +1,36 @@
 # app/refiner.py
 import re
 from datetime import datetime
+from functools import lru_cache
 from app.config import (
     IGNORE_DOMAINS, ACCEPTED_ROLES, PREFIXES_TO_STRIP,
-    INDIAN_CITIES, FOREIGN_LOCATIONS
+    INDIAN_CITIES, FOREIGN_LOCATIONS, DOMAIN_KEYWORDS, TECH_NOTE_KEYWORDS,
+    BLOCKED_EMAIL_KEYWORDS, GENERIC_EMAIL_DOMAINS, EMAIL_DOMAIN_CACHE_SIZE
 )
+from app.scanner import KeywordHits, scan_block
+
+# Lowercase keyword -> display name for extract_location
+LOCATION_NAMES = {loc.lower(): loc for loc in FOREIGN_LOCATIONS + INDIAN_CITIES}
+
+EMAIL_PATTERN = re.compile(r'[a-zA-Z0-9._%+-]+@(?P<domain>[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})')
+
+# We look for Capitalized sequences associated with hiring phrases
+COMPANY_PATTERNS = [
+    # "Hiring for Zensar"
+    re.compile(r"(?:Hiring for|Client[:\-])\s+([A-Z][a-z0-9]+(?:\s[A-Z][a-z0-9]+)*)"),
+    # "Zensar is hiring"
+    re.compile(r"([A-Z][a-z0-9]+(?:\s[A-Z][a-z0-9]+)*)\s+(?:is hiring|is looking for)"),
+    # "Zensar Technologies"
+    re.compile(r"([A-Z][a-z0-9]+)\s+(?:Pvt\.?\s*Ltd|Technologies|Solutions|Systems|Private\s*Limited)"),
+]
+
+# Generic words to ignore if a company pattern captures them
+COMPANY_IGNORE_WORDS = {"The", "A", "An", "This", "Our",
+                        "Client", "Company", "Organization", "We", "You"}
+
+# Filename tokens that never name a company (cities + common junk)
+FILENAME_IGNORE_TOKENS = set(LOCATION_NAMES) | {
+    "resume", "cv", "job", "jobs", "jd", "hiring", "opening", "profile"}
 
 
 def format_experience(exp_min: int, exp_max: int) -> str:
@@ -36,48 +62,80 @@ def format_experience(exp_min: int, exp_max: int) -> str:
 def refine_job_batch(raw_jobs: list) -> list:
     """
     Stage 2: Transforms raw blocks into Final Master Tracker rows.
+    Jobs carrying "Refined_Fields" (memoized refine_job output) reuse them.
+    "Seen In" counts the PDFs of the batch the block appeared in ("Seen_In").
     """
     refined = []
+    # One timestamp for the whole batch
+    last_updated = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     for job in raw_jobs:
         if job.get("status") != "Selected":
             continue
 
-        raw_text = job.get("Raw_Text", "")
-
-        # 1. Email Extraction & Filtering
-        valid_email = extract_valid_email(raw_text)
-
-        # 2. Company Extraction (Priority Logic)
-        company = extract_company(raw_text, valid_email)
-
-        # 3. Role Normalization
-        role = extract_role(raw_text)
-
-        # 4. Location & Mode
-        location = extract_location(raw_text)
-        mode = extract_mode(raw_text, location)
-
-        # 5. Experience Normalization
-        exp_display = format_experience(job.get('Exp_Min'), job.get('Exp_Max'))
+        fields = job.get("Refined_Fields")
+        if fields is None:
+            fields = refine_job(job)
 
         entry = {
             "S.No": len(refined) + 1,
-            "Company": company,
-            "Role": role,
-            "Exp": exp_display,  # Updated to use normalized helper
-            "Location": location,
-            "Mode": mode,
-            "Email": valid_email,
+            "Company": fields["Company"],
+            "Role": fields["Role"],
+            "Exp": fields["Exp"],
+            "Location": fields["Location"],
+            "Mode": fields["Mode"],
+            "Email": fields["Email"],
             "Source_PDF": job.get("Source_PDF"),
-            "Notes": generate_tech_notes(raw_text),
-            "Domain": extract_domain(raw_text),
-            "Last Updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            "Notes": fields["Notes"],
+            "Domain": fields["Domain"],
+            "Last Updated": last_updated,
+            "Seen In": len(job.get("Seen_In") or ()) or 1
         }
         refined.append(entry)
 
     return refined
 
+
+# Columns that depend only on the block itself (not on the run or file)
+BLOCK_FIELDS = ("Company", "Role", "Exp", "Location", "Mode", "Email", "Notes", "Domain")
+
+
+def refine_job(job: dict) -> dict:
+    """
+    The BLOCK_FIELDS columns for one selected Stage-1 job.
+    """
+    raw_text = job.get("Raw_Text", "")
+    # Per-block context from Stage 1: the lowercased text plus every keyword
+    # lookup made so far, shared by the helpers below
+    hits = job.get("Keyword_Hits")
+    if hits is None:
+        hits = scan_block(raw_text)
+
+    # 1. Email Extraction & Filtering
+    valid_email = extract_valid_email(raw_text)
+
+    # 2. Company Extraction (Priority Logic)
+    company = extract_company(raw_text, valid_email)
+
+    # 3. Role Normalization
+    role = extract_role(raw_text, hits)
+
+    # 4. Location & Mode
+    location = extract_location(raw_text, hits)
+    mode = extract_mode(raw_text, location, hits)
+
+    return {
+        "Company": company,
+        "Role": role,
+        # 5. Experience Normalization
+        "Exp": format_experience(job.get('Exp_Min'), job.get('Exp_Max')),
+        "Location": location,
+        "Mode": mode,
+        "Email": valid_email,
+        "Notes": generate_tech_notes(raw_text, hits),
+        "Domain": extract_domain(raw_text, hits),
+    }
+
 # --- HELPERS ---
 
 
@@ -88,44 +146,43 @@ def extract_valid_email(text: str) -> str:
     Priority 2: Allowed Generic (Gmail/Outlook) - (Fallback)
     Priority 3: Blocked (JobCurator/Telegram/WhatsApp) - (Ignored)
     """
-    # Regex to find all potential email addresses
-    emails = re.findall(
-        r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', text)
+    fallback = None
 
-    fallback_candidates = []
-
-    # Priority 3: Strictly Blocked Patterns (never use)
-    blocked_keywords = ["jobcurator", "telegram",
-                        "whatsapp", "noreply", "donotreply"]
-
-    # Priority 2: Allowed Generic Domains (use only if no corporate email exists)
-    allowed_generic_domains = {
-        "gmail.com", "outlook.com", "yahoo.com",
-        "hotmail.com", "rediffmail.com", "icloud.com"
-    }
-
-    for email in emails:
-        domain = email.split('@')[1].lower()
+    for m in EMAIL_PATTERN.finditer(text):
+        kind = classify_email_domain(m["domain"])
 
         # 1. CHECK PRIORITY 3 (BLOCKED)
-        if any(keyword in domain for keyword in blocked_keywords):
+        if kind == "blocked":
             continue
 
         # 2. CHECK PRIORITY 2 (ALLOWED GENERIC)
-        if domain in allowed_generic_domains:
-            fallback_candidates.append(email)
+        if kind == "generic":
+            if fallback is None:
+                fallback = m.group()
             continue
 
         # 3. CHECK PRIORITY 1 (CORPORATE)
         # If it's not blocked and not generic, we assume it's a priority corporate email.
         # We prefer the first corporate email found.
-        return email
+        return m.group()
 
     # 4. FALLBACK SELECTION
-    if fallback_candidates:
-        return fallback_candidates[0]
+    return fallback or "Apply via Company Portal"
 
-    return "Apply via Company Portal"
+
+@lru_cache(maxsize=EMAIL_DOMAIN_CACHE_SIZE)
+def classify_email_domain(domain: str) -> str:
+    """
+    "blocked", "generic" or "corporate" for an email domain, per
+    BLOCKED_EMAIL_KEYWORDS / GENERIC_EMAIL_DOMAINS in app/config.py.
+    The same recruiter domains recur across compilations, hence the cache.
+    """
+    domain = domain.lower()
+    if any(keyword in domain for keyword in BLOCKED_EMAIL_KEYWORDS):
+        return "blocked"
+    if domain in GENERIC_EMAIL_DOMAINS:
+        return "generic"
+    return "corporate"
 
 
 def extract_company(text: str, email: str, filename: str = "") -> str:
@@ -147,27 +204,13 @@ def extract_company(text: str, email: str, filename: str = "") -> str:
         except IndexError:
             pass
 
-    # --- PRIORITY 2: Text-Based Patterns ---
-    # We look for Capitalized sequences associated with hiring phrases
-    patterns = [
-        # "Hiring for Zensar"
-        r"(?:Hiring for|Client[:\-])\s+([A-Z][a-z0-9]+(?:\s[A-Z][a-z0-9]+)*)",
-        # "Zensar is hiring"
-        r"([A-Z][a-z0-9]+(?:\s[A-Z][a-z0-9]+)*)\s+(?:is hiring|is looking for)",
-        # "Zensar Technologies"
-        r"([A-Z][a-z0-9]+)\s+(?:Pvt\.?\s*Ltd|Technologies|Solutions|Systems|Private\s*Limited)"
-    ]
-
-    # Generic words to ignore if regex captures them
-    ignore_words = {"The", "A", "An", "This", "Our",
-                    "Client", "Company", "Organization", "We", "You"}
-
-    for pat in patterns:
-        m = re.search(pat, text)
+    # --- PRIORITY 2: Text-Based Patterns (COMPANY_PATTERNS) ---
+    for pat in COMPANY_PATTERNS:
+        m = pat.search(text)
         if m:
             candidate = m.group(1).strip()
             # Validation: Length > 2 and not a generic word
-            if len(candidate) > 2 and candidate.title() not in ignore_words:
+            if len(candidate) > 2 and candidate.title() not in COMPANY_IGNORE_WORDS:
                 return candidate.title()
 
     # --- PRIORITY 3: PDF Filename Heuristic ---
@@ -179,19 +222,9 @@ def extract_company(text: str, email: str, filename: str = "") -> str:
         tokens = clean_name.split()
         filtered_tokens = []
 
-        # Build strict ignore list (Cities + Common junk)
-        # Assuming INDIAN_CITIES and FOREIGN_LOCATIONS are imported from config
-        locations_lower = {loc.lower()
-                           for loc in INDIAN_CITIES + FOREIGN_LOCATIONS}
-        junk_lower = {"resume", "cv", "job", "jobs",
-                      "jd", "hiring", "opening", "profile"}
-
         for token in tokens:
-            t_lower = token.lower()
             # Filter out numbers, locations, and junk words
-            if (not token.isdigit() and
-                t_lower not in locations_lower and
-                    t_lower not in junk_lower):
+            if not token.isdigit() and token.lower() not in FILENAME_IGNORE_TOKENS:
                 filtered_tokens.append(token)
 
         if filtered_tokens:
@@ -201,15 +234,12 @@ def extract_company(text: str, email: str, filename: str = "") -> str:
     return "Confidential / Client via Consultancy"
 
 
-def extract_role(text: str) -> str:
-    text_lower = text.lower()
+def extract_role(text: str, hits: KeywordHits = None) -> str:
+    if hits is None:
+        hits = scan_block(text)
 
     # Find longest matching role
-    best_match = ""
-    for role in ACCEPTED_ROLES:
-        if role in text_lower:
-            if len(role) > len(best_match):
-                best_match = role
+    best_match = max(hits.present(ACCEPTED_ROLES), key=len, default="")
 
     if not best_match:
         return "QA / SDET"
@@ -223,23 +253,15 @@ def extract_role(text: str) -> str:
     return best_match.title()
 
 
-def extract_location(text: str) -> str:
-    t = text.lower()
-    locs = set()
-
-    # Check Foreign
-    for f_loc in FOREIGN_LOCATIONS:
-        if f_loc.lower() in t:
-            locs.add(f_loc)
-
-    # Check Indian Cities
-    for city in INDIAN_CITIES:
-        if city.lower() in t:
-            locs.add(city)
+def extract_location(text: str, hits: KeywordHits = None) -> str:
+    if hits is None:
+        hits = scan_block(text)
+    # Foreign locations and Indian cities, in their display spelling
+    locs = {LOCATION_NAMES[key] for key in hits.present(LOCATION_NAMES)}
 
-    if "pan india" in t:
+    if hits["pan india"]:
         locs.add("Pan India")
-    elif "remote" in t and not locs:
+    elif hits["remote"] and not locs:
         locs.add("Remote")
 
     if not locs:
@@ -248,13 +270,14 @@ def extract_location(text: str) -> str:
     return ", ".join(sorted(locs))
 
 
-def extract_mode(text: str, location_str: str) -> str:
-    t = text.lower()
-    if "remote" in t and "hybrid" not in t:
+def extract_mode(text: str, location_str: str, hits: KeywordHits = None) -> str:
+    if hits is None:
+        hits = scan_block(text)
+    if hits["remote"] and not hits["hybrid"]:
         return "Remote"
-    if "hybrid" in t:
+    if hits["hybrid"]:
         return "Hybrid"
-    if "wfo" in t or "work from office" in t or "on-site" in t:
+    if hits["wfo"] or hits["work from office"] or hits["on-site"]:
         return "Work From Office"
 
     # Heuristic: If location is "Remote", mode is Remote
@@ -264,43 +287,29 @@ def extract_mode(text: str, location_str: str) -> str:
     return "Full-time"
 
 
-def extract_domain(text: str) -> str:
-    t = text.lower()
-    if any(k in t for k in ["bank", "fintech", "payment", "financial"]):
-        return "FinTech"
-    if any(k in t for k in ["health", "medical", "pharma"]):
-        return "Healthcare"
-    if any(k in t for k in ["ecommerce", "retail", "shopping"]):
-        return "E-commerce"
-    if "saas" in t:
-        return "SaaS"
+def extract_domain(text: str, hits: KeywordHits = None) -> str:
+    if hits is None:
+        hits = scan_block(text)
+    # First matching domain wins (see DOMAIN_KEYWORDS in app/config.py)
+    for domain, keywords in DOMAIN_KEYWORDS:
+        if hits.first(keywords) is not None:
+            return domain
     return "IT Services"
 
 
-def generate_tech_notes(text: str) -> str:
+def generate_tech_notes(text: str, hits: KeywordHits = None) -> str:
     """
     Extracts top 4 skills based on strict priority order.
     Returns 'Skill1 + Skill2...' or 'QA Role' if none found.
     """
-    t = text.lower()
-
-    # Priority Order: (Output Format, Search Keyword)
-    # The order of this list enforces the priority requirement.
-    priority_map = [
-        ("Java", "java"),
-        ("Python", "python"),
-        ("Selenium", "selenium"),
-        ("API", "api"),
-        ("Manual", "manual"),
-        ("SQL", "sql"),
-        ("Appium", "appium"),
-        ("Playwright", "playwright")
-    ]
+    if hits is None:
+        hits = scan_block(text)
 
     found_skills = []
 
-    for display_name, keyword in priority_map:
-        if keyword in t:
+    # The order of TECH_NOTE_KEYWORDS enforces the priority requirement.
+    for display_name, keyword in TECH_NOTE_KEYWORDS:
+        if hits[keyword]:
             found_skills.append(display_name)
 
             # STRICT REQUIREMENT: Max 4 skills
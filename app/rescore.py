@@ -0,0 +1,94 @@
+# app/rescore.py
+# Re-runs Stage 1 and refinement over the block features saved by /process
+# (app/features.py), e.g. after tuning the keyword lists in app/config.py:
+#
+#     python -m app.rescore --since 2026-09-01 --out rescored.xlsx
+import argparse
+import json
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+import pandas as pd
+from app.features import FEATURE_STORE
+from app.rules import BlockFeatures, evaluate_block, describe_evaluation
+from app.refiner import refine_job, refine_job_batch
+from app.dedup import KeyIndex, append_new_jobs
+from app.excel_writer import generate_master_excel
+
+
+def parse_date(value: Optional[str]) -> Optional[float]:
+    """YYYY-MM-DD (local time) to a Unix timestamp; None stays None."""
+    if not value:
+        return None
+    return datetime.strptime(value, "%Y-%m-%d").timestamp()
+
+
+def rescore_stored_blocks(since: float = None, until: float = None) -> tuple[list, dict]:
+    """
+    Evaluates and refines every stored block of the runs created in
+    [since, until) with the current rules. Each distinct text is evaluated
+    once. Returns (tracker rows deduplicated and numbered from 1, summary).
+    """
+    outcomes = {}  # text_hash -> (status, reason, refined fields)
+    reasons = Counter()
+    runs = set()
+    selected = []
+
+    for row in FEATURE_STORE.iter_blocks(since, until):
+        runs.add(row["run_id"])
+        outcome = outcomes.get(row["text_hash"])
+        if outcome is None:
+            experience = None
+            if row["exp_min"] is not None:
+                experience = (row["exp_min"], row["exp_max"])
+            block = BlockFeatures(row["text"], row["hits"], experience)
+            evaluation = evaluate_block(block)
+
+            fields = None
+            if evaluation["status"] == "Selected":
+                exp_min, exp_max = block.experience
+                fields = refine_job({
+                    "Raw_Text": block.text, "Keyword_Hits": block.hits,
+                    "Exp_Min": exp_min, "Exp_Max": exp_max,
+                })
+            reason, _ = describe_evaluation(evaluation)
+            outcome = outcomes[row["text_hash"]] = (evaluation["status"], reason, fields)
+
+        status, reason, fields = outcome
+        reasons[reason] += 1
+        if status == "Selected":
+            selected.append({
+                "Source_PDF": row["source_pdf"], "status": status, "Refined_Fields": fields})
+
+    rows = append_new_jobs(refine_job_batch(selected), KeyIndex(), 1)
+    summary = {
+        "runs": len(runs),
+        "blocks": sum(reasons.values()),
+        "distinct_blocks": len(outcomes),
+        "selected": len(selected),
+        "new_rows": len(rows),
+        "reasons": dict(reasons.most_common()),
+    }
+    return rows, summary
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.rescore",
+        description="Re-run the rules over blocks saved by past /process runs.")
+    parser.add_argument("--since", help="first run date to include, YYYY-MM-DD")
+    parser.add_argument("--until", help="stop before runs on this date, YYYY-MM-DD")
+    parser.add_argument("--out", help="write the rescored tracker to this .xlsx file")
+    args = parser.parse_args(argv)
+
+    rows, summary = rescore_stored_blocks(parse_date(args.since), parse_date(args.until))
+    print(json.dumps(summary, indent=2))
+
+    if args.out:
+        with open(args.out, "wb") as f:
+            f.write(generate_master_excel(pd.DataFrame(rows)).getvalue())
+        print(f"Wrote {len(rows)} rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -84,95 +84,272 @@
 
 # app/rules.py
 import re
+import threading
+from collections import Counter
+from typing import Callable, Optional, Tuple
 from app.config import (
     ACCEPTED_ROLES, REQUIRED_TECH, CONDITIONAL_TECH_EXCLUSIONS,
     HARD_TECH_EXCLUSIONS, HIRING_EXCLUSIONS, EMPLOYMENT_EXCLUSIONS,
     MIN_EXP_REQUIRED, MAX_START_EXP_ALLOWED
 )
+from app.experience_parser import extract_experience_years
+from app.scanner import KeywordHits, scan_block
 
+# Negative lookbehind: matches term if NOT preceded by "no " or "not "
+HIRING_PATTERNS = {
+    term: re.compile(fr'(?<!no\s)(?<!not\s){re.escape(term)}') for term in HIRING_EXCLUSIONS
+}
 
-def evaluate_job_block(text: str, exp_min: int, exp_max: int) -> dict:
+# --- RULE CODES ---
+# Rules report (code, args) pairs; text is only formatted for diagnostics.
+MATCHES_CRITERIA = 0
+ROLE_MISMATCH = 1
+ROLE_OK = 2
+HARD_EXCLUSION = 3
+TOOL_ONLY_EXCLUSION = 4
+TOOL_SAFEGUARD = 5
+MISSING_REQUIRED_TECH = 6
+HIRING_MODE = 7
+EMPLOYMENT_TYPE = 8
+NO_EXPERIENCE = 9
+EXPERIENCE_TOO_LOW = 10
+EXPERIENCE_TOO_HIGH = 11
+EXPERIENCE_OK = 12
+
+# code -> (debug_log line, reason); reason is None for notes that don't decide
+RULE_MESSAGES = {
+    MATCHES_CRITERIA: (None, "Matches Criteria"),
+    ROLE_MISMATCH: ("Role: No valid QA/SDET specific keyword found.", "Role Mismatch (Strict)"),
+    ROLE_OK: ("Role: Valid keyword found.", None),
+    HARD_EXCLUSION: ("Exclusion: Found prohibited term '{0}'", "Hard Exclusion ({0})"),
+    TOOL_ONLY_EXCLUSION: ("Exclusion: '{0}' found without safeguards.", "Tool-Only Exclusion ({0})"),
+    TOOL_SAFEGUARD: ("Safeguard: '{0}' allowed due to required tech.", None),
+    MISSING_REQUIRED_TECH: ("Tech: No required tech stack found (Selenium/Java/Manual/API/SQL).",
+                            "Missing Required Tech"),
+    HIRING_MODE: ("Exclusion: Found hiring mode '{0}'.", "Hiring Mode ({0})"),
+    EMPLOYMENT_TYPE: ("Exclusion: Found employment type '{0}'.", "Employment Type ({0})"),
+    NO_EXPERIENCE: ("Exp: None found.", "No Experience Found"),
+    EXPERIENCE_TOO_LOW: (f"Exp: Too low ({{0}} < {MIN_EXP_REQUIRED}).", "Fresher/Low Exp ({0} yr)"),
+    EXPERIENCE_TOO_HIGH: (f"Exp: Starts too high ({{0}} > {MAX_START_EXP_ALLOWED}).",
+                          f"Senior/High Exp (Start > {MAX_START_EXP_ALLOWED})"),
+    EXPERIENCE_OK: ("Exp: Valid range ({0}-{1}).", None),
+}
+
+
+class BlockFeatures:
     """
-    Evaluates a specific text block against Master Rules.
-    Strictly deterministic Stage-1 evaluation.
+    Inputs to the rule program for one block, computed on first use.
+    Experience is only parsed if a block survives every keyword rule.
     """
-    t = text.lower()
-    logs = []
+    __slots__ = ("text", "_hits", "_experience")
+
+    def __init__(self, text: str, hits: KeywordHits = None,
+                 experience: Tuple[Optional[int], Optional[int]] = None):
+        self.text = text
+        self._hits = hits
+        self._experience = experience
+
+    @property
+    def hits(self) -> KeywordHits:
+        if self._hits is None:
+            self._hits = scan_block(self.text)
+        return self._hits
+
+    @property
+    def experience(self) -> Tuple[Optional[int], Optional[int]]:
+        if self._experience is None:
+            self._experience = extract_experience_years(self.text)
+        return self._experience
+
+    @property
+    def parsed_experience(self) -> Tuple[Optional[int], Optional[int]]:
+        """(min, max) if a rule needed it, else (None, None) without parsing."""
+        return self._experience or (None, None)
+
+
+# Each rule returns (code, args) to reject the block, or None to pass.
+# Notes on passing checks go to `trace`, which is None unless diagnostics are on.
+Rule = Callable[[BlockFeatures, Optional[list]], Optional[tuple]]
+
 
-    # --- 1. ROLE RELEVANCE (STRICT) ---
+def _check_role(block: BlockFeatures, trace: Optional[list]) -> Optional[tuple]:
     # Must match one of the explicitly allowed roles in app/config.py
     # Removed generic fallback to prevent loose matches.
-    if not any(role in t for role in ACCEPTED_ROLES):
-        logs.append("Role: No valid QA/SDET specific keyword found.")
-        return _reject("Role Mismatch (Strict)", logs)
+    if block.hits.first(ACCEPTED_ROLES) is None:
+        return ROLE_MISMATCH, ()
+    if trace is not None:
+        trace.append((ROLE_OK, ()))
+    return None
 
-    logs.append("Role: Valid keyword found.")
 
-    # --- 2. HARD TECH EXCLUSION ---
+def _check_hard_exclusion(block: BlockFeatures, trace: Optional[list]) -> Optional[tuple]:
     # Reject Developer, DevOps, Data, etc.
-    for excl in HARD_TECH_EXCLUSIONS:
-        if excl in t:
-            logs.append(f"Exclusion: Found prohibited term '{excl}'")
-            return _reject(f"Hard Exclusion ({excl})", logs)
+    excl = block.hits.first(HARD_TECH_EXCLUSIONS)
+    if excl is not None:
+        return HARD_EXCLUSION, (excl,)
+    return None
 
-    # --- 3. CONDITIONAL TECH EXCLUSION (Tool-Only) ---
+
+def _check_tool_only(block: BlockFeatures, trace: Optional[list]) -> Optional[tuple]:
     # Reject Python/Playwright/etc. ONLY if no Safe Tech (Java/Selenium) exists
-    bad_techs = [excl for excl in CONDITIONAL_TECH_EXCLUSIONS if excl in t]
-    if bad_techs:
-        has_safeguard = any(req in t for req in REQUIRED_TECH)
-        if not has_safeguard:
-            logs.append(
-                f"Exclusion: '{bad_techs[0]}' found without safeguards.")
-            return _reject(f"Tool-Only Exclusion ({bad_techs[0]})", logs)
-        else:
-            logs.append(
-                f"Safeguard: '{bad_techs[0]}' allowed due to required tech.")
-
-    # --- 4. REQUIRED TECHNOLOGY (AT LEAST ONE) ---
+    bad_tech = block.hits.first(CONDITIONAL_TECH_EXCLUSIONS)
+    if bad_tech is None:
+        return None
+    if block.hits.first(REQUIRED_TECH) is None:
+        return TOOL_ONLY_EXCLUSION, (bad_tech,)
+    if trace is not None:
+        trace.append((TOOL_SAFEGUARD, (bad_tech,)))
+    return None
+
+
+def _check_required_tech(block: BlockFeatures, trace: Optional[list]) -> Optional[tuple]:
     # Must have Selenium, Java, SQL, Manual, etc.
-    if not any(req in t for req in REQUIRED_TECH):
-        logs.append(
-            "Tech: No required tech stack found (Selenium/Java/Manual/API/SQL).")
-        return _reject("Missing Required Tech", logs)
+    if block.hits.first(REQUIRED_TECH) is None:
+        return MISSING_REQUIRED_TECH, ()
+    return None
 
-    # --- 5. HIRING MODE (Context Aware) ---
+
+def _check_hiring_mode(block: BlockFeatures, trace: Optional[list]) -> Optional[tuple]:
     # Reject Walk-in/Drive unless negated ("No Walk-in")
-    for term in HIRING_EXCLUSIONS:
-        if term in t:
-            # Negative lookbehind: matches term if NOT preceded by "no " or "not "
-            pattern = fr'(?<!no\s)(?<!not\s){re.escape(term)}'
-            if re.search(pattern, t):
-                logs.append(f"Exclusion: Found hiring mode '{term}'.")
-                return _reject(f"Hiring Mode ({term})", logs)
-
-    # --- 6. EMPLOYMENT TYPE ---
+    hits = block.hits
+    for term in hits.present(HIRING_EXCLUSIONS):
+        if HIRING_PATTERNS[term].search(hits.lower):
+            return HIRING_MODE, (term,)
+    return None
+
+
+def _check_employment_type(block: BlockFeatures, trace: Optional[list]) -> Optional[tuple]:
     # Reject Contract, Internship, etc.
-    for excl in EMPLOYMENT_EXCLUSIONS:
-        if excl in t:
-            logs.append(f"Exclusion: Found employment type '{excl}'.")
-            return _reject(f"Employment Type ({excl})", logs)
+    excl = block.hits.first(EMPLOYMENT_EXCLUSIONS)
+    if excl is not None:
+        return EMPLOYMENT_TYPE, (excl,)
+    return None
 
-    # --- 7. EXPERIENCE LOGIC (LOWER BOUND DOMINANCE) ---
+
+def _check_experience(block: BlockFeatures, trace: Optional[list]) -> Optional[tuple]:
+    # Lower bound dominance; the only rule that needs the experience parse
+    exp_min, exp_max = block.experience
     if exp_min is None:
-        logs.append("Exp: None found.")
-        return _reject("No Experience Found", logs)
+        return NO_EXPERIENCE, ()
 
     # Rule A: Reject Freshers (e.g. 0-1 years)
     if exp_min < MIN_EXP_REQUIRED:
-        logs.append(f"Exp: Too low ({exp_min} < {MIN_EXP_REQUIRED}).")
-        return _reject(f"Fresher/Low Exp ({exp_min} yr)", logs)
+        return EXPERIENCE_TOO_LOW, (exp_min,)
 
     # Rule B: Reject Senior Starts (>5 years)
     # Logic: 4-9 is Accepted (4 <= 5). 6-10 is Rejected (6 > 5).
     # This automatically filters "Senior/Lead" roles if their requirements exceed 5 years.
     if exp_min > MAX_START_EXP_ALLOWED:
-        logs.append(
-            f"Exp: Starts too high ({exp_min} > {MAX_START_EXP_ALLOWED}).")
-        return _reject(f"Senior/High Exp (Start > {MAX_START_EXP_ALLOWED})", logs)
+        return EXPERIENCE_TOO_HIGH, (exp_min,)
+
+    if trace is not None:
+        trace.append((EXPERIENCE_OK, (exp_min, exp_max)))
+    return None
+
+
+# Canonical rule order. A block's reason is the first rule here that fails,
+# and cheap keyword rules come before the experience parse.
+RULE_PROGRAM: list[tuple[str, Rule]] = [
+    ("role", _check_role),
+    ("hard_exclusion", _check_hard_exclusion),
+    ("tool_only", _check_tool_only),
+    ("required_tech", _check_required_tech),
+    ("hiring_mode", _check_hiring_mode),
+    ("employment_type", _check_employment_type),
+    ("experience", _check_experience),
+]
+
+# Blocks rejected per rule, plus "selected" (per uvicorn process). Requests
+# evaluate in threadpool threads, so updates take the lock.
+RULE_STATS: Counter = Counter()
+_RULE_STATS_LOCK = threading.Lock()
+
+# Deciding rule_code -> RULE_STATS entry, for evaluations replayed from the block cache
+STATS_NAME_OF_CODE = {
+    MATCHES_CRITERIA: "selected",
+    ROLE_MISMATCH: "role",
+    HARD_EXCLUSION: "hard_exclusion",
+    TOOL_ONLY_EXCLUSION: "tool_only",
+    MISSING_REQUIRED_TECH: "required_tech",
+    HIRING_MODE: "hiring_mode",
+    EMPLOYMENT_TYPE: "employment_type",
+    NO_EXPERIENCE: "experience",
+    EXPERIENCE_TOO_LOW: "experience",
+    EXPERIENCE_TOO_HIGH: "experience",
+}
+
+
+def evaluate_block(block: BlockFeatures, diagnostics: bool = False) -> dict:
+    """
+    Runs RULE_PROGRAM over a block, stopping at the first failing rule.
+    Strictly deterministic Stage-1 evaluation.
+    Returns {"status", "rule_code", "rule_args"}; with diagnostics, also the
+    "trace" of (code, args) notes that describe_evaluation turns into text.
+    """
+    trace = [] if diagnostics else None
+    for name, rule in RULE_PROGRAM:
+        failure = rule(block, trace)
+        if failure is not None:
+            with _RULE_STATS_LOCK:
+                RULE_STATS[name] += 1
+            return _result("Rejected", failure, trace)
+
+    with _RULE_STATS_LOCK:
+        RULE_STATS["selected"] += 1
+    return _result("Selected", (MATCHES_CRITERIA, ()), trace)
+
+
+def count_cached_evaluation(rule_code: int) -> None:
+    """Counts a block whose evaluation came from the block cache, as evaluate_block would have."""
+    with _RULE_STATS_LOCK:
+        RULE_STATS[STATS_NAME_OF_CODE[rule_code]] += 1
+
+
+def evaluate_job_block(text: str, exp_min: int, exp_max: int, hits: KeywordHits = None) -> dict:
+    """
+    Evaluates a specific text block against Master Rules, given its
+    already-parsed experience. Returns status, reason and debug_log text.
+    """
+    evaluation = evaluate_block(BlockFeatures(text, hits, (exp_min, exp_max)), diagnostics=True)
+    return _described(evaluation)
+
+
+def describe_evaluation(evaluation: dict) -> tuple[str, list[str]]:
+    """
+    (reason, debug_log) text for an evaluation. The debug_log needs the
+    trace, so it is empty unless the block was evaluated with diagnostics.
+    """
+    template, reason = RULE_MESSAGES[evaluation["rule_code"]]
+    reason = reason.format(*evaluation["rule_args"])
+    logs = []
+    for code, args in evaluation.get("trace") or ():
+        line = RULE_MESSAGES[code][0]
+        if line is not None:
+            logs.append(line.format(*args))
+    return reason, logs
+
+
+def rule_stats() -> dict:
+    """
+    Rejections per rule in canonical order, with the number of blocks seen
+    (block-cache hits included; a block repeated within a batch counts once).
+    """
+    return {
+        "blocks": sum(RULE_STATS.values()),
+        "selected": RULE_STATS["selected"],
+        "rejected_by": {name: RULE_STATS[name] for name, _ in RULE_PROGRAM},
+    }
+
 
-    logs.append(f"Exp: Valid range ({exp_min}-{exp_max}).")
-    return {"status": "Selected", "reason": "Matches Criteria", "debug_log": logs}
+def _result(status, outcome, trace):
+    code, args = outcome
+    result = {"status": status, "rule_code": code, "rule_args": args}
+    if trace is not None:
+        trace.append(outcome)
+        result["trace"] = trace
+    return result
 
 
-def _reject(reason, logs):
-    return {"status": "Rejected", "reason": reason, "debug_log": logs}
+def _described(evaluation):
+    reason, logs = describe_evaluation(evaluation)
+    return {"status": evaluation["status"], "reason": reason, "debug_log": logs}
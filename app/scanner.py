@@ -0,0 +1,109 @@
+# app/scanner.py
+import ahocorasick
+from app.config import (
+    ACCEPTED_ROLES, REQUIRED_TECH, CONDITIONAL_TECH_EXCLUSIONS,
+    HARD_TECH_EXCLUSIONS, HIRING_EXCLUSIONS, EMPLOYMENT_EXCLUSIONS,
+    INDIAN_CITIES, FOREIGN_LOCATIONS, DOMAIN_KEYWORDS, TECH_NOTE_KEYWORDS
+)
+
+# Literal checks in refiner.extract_location / extract_mode
+LOCATION_MODE_KEYWORDS = [
+    "pan india", "remote", "hybrid", "wfo", "work from office", "on-site"
+]
+
+# Every keyword any rule or refiner helper looks for, lowercased and
+# de-duplicated once at import
+SCAN_KEYWORDS = tuple(sorted(
+    {kw.lower() for kw in (
+        ACCEPTED_ROLES + REQUIRED_TECH + CONDITIONAL_TECH_EXCLUSIONS
+        + HARD_TECH_EXCLUSIONS + HIRING_EXCLUSIONS + EMPLOYMENT_EXCLUSIONS
+        + INDIAN_CITIES + FOREIGN_LOCATIONS + LOCATION_MODE_KEYWORDS
+        + [kw for _, kws in DOMAIN_KEYWORDS for kw in kws]
+        + [kw for _, kw in TECH_NOTE_KEYWORDS]
+    )}
+))
+
+SCAN_INDEX = {kw: i for i, kw in enumerate(SCAN_KEYWORDS)}
+
+# Bitset with every SCAN_KEYWORDS entry set (see KeywordHits.to_masks)
+ALL_SCAN_KEYWORDS = (1 << len(SCAN_KEYWORDS)) - 1
+
+
+def _build_automaton() -> ahocorasick.Automaton:
+    automaton = ahocorasick.Automaton()
+    for kw in SCAN_KEYWORDS:
+        automaton.add_word(kw, kw)
+    automaton.make_automaton()
+    return automaton
+
+
+# Aho-Corasick automaton over SCAN_KEYWORDS, built once at import
+SCAN_AUTOMATON = _build_automaton()
+
+
+class KeywordHits(dict):
+    """
+    Keyword hit map for one block: hits[kw] is True when the lowercase keyword
+    occurs in the block (same as `kw in text.lower()`). The block is lowercased
+    once and every SCAN_KEYWORDS entry is found in a single pass of
+    SCAN_AUTOMATON; any other keyword is searched on first use and remembered.
+    """
+    __slots__ = ("lower", "scanned")
+
+    def __init__(self, text: str, scanned: frozenset = None):
+        super().__init__()
+        self.lower = text.lower()
+        if scanned is None:
+            scanned = frozenset(kw for _, kw in SCAN_AUTOMATON.iter(self.lower))
+        self.scanned = scanned
+
+    def __missing__(self, keyword: str) -> bool:
+        if keyword in SCAN_INDEX:
+            return keyword in self.scanned
+        found = self[keyword] = keyword in self.lower
+        return found
+
+    def first(self, keywords):
+        """First of `keywords` present in the block, or None."""
+        scanned = self.scanned
+        for kw in keywords:
+            if (kw in scanned if kw in SCAN_INDEX else self[kw]):
+                return kw
+        return None
+
+    def present(self, keywords) -> list:
+        """Every one of `keywords` present in the block, in the given order."""
+        scanned = self.scanned
+        return [kw for kw in keywords if (kw in scanned if kw in SCAN_INDEX else self[kw])]
+
+    def to_masks(self) -> tuple[int, int]:
+        """
+        (looked_up, present) bitsets over SCAN_KEYWORDS; what the feature
+        store keeps instead of the map. The scan covers every keyword, so
+        looked_up is always ALL_SCAN_KEYWORDS.
+        """
+        present = 0
+        for kw in self.scanned:
+            present |= 1 << SCAN_INDEX[kw]
+        return ALL_SCAN_KEYWORDS, present
+
+    @classmethod
+    def from_masks(cls, text: str, keywords, looked_up: int, present: int) -> "KeywordHits":
+        """
+        Rebuilds a hit map from to_masks() bitsets taken over `keywords`
+        (the SCAN_KEYWORDS of the run that stored them). Bitsets over another
+        vocabulary, or covering only part of it, are ignored and the text is
+        scanned again.
+        """
+        if looked_up != ALL_SCAN_KEYWORDS or tuple(keywords) != SCAN_KEYWORDS:
+            return cls(text)
+        return cls(text, frozenset(kw for i, kw in enumerate(keywords) if present >> i & 1))
+
+    def found(self) -> frozenset:
+        """Every SCAN_KEYWORDS entry present in the block."""
+        return self.scanned
+
+
+def scan_block(text: str) -> KeywordHits:
+    """Returns the block's keyword hit map, shared by rules and refiner."""
+    return KeywordHits(text)
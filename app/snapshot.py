@@ -0,0 +1,153 @@
+# app/snapshot.py
+import datetime
+import hashlib
+import io
+import json
+import math
+import zipfile
+import zlib
+from typing import Optional
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell.cell import ERROR_CODES, ILLEGAL_CHARACTERS_RE
+from openpyxl.packaging.manifest import Override
+from openpyxl.writer.excel import ExcelWriter
+from app.xlsx_reader import number_value, rows_frame, sheet_part
+
+# Custom part of the tracker's zip package holding the first sheet as
+# pandas reads it back; spreadsheet apps ignore it (and drop it on save).
+# No extension: its content type is registered as an Override only, where
+# openpyxl would map ".bin" to the VBA project type
+SNAPSHOT_PART = "jobCurator/masterSnapshot"
+SNAPSHOT_CONTENT_TYPE = "application/vnd.job-curator.master-snapshot+json+zlib"
+
+# Bump when the payload layout changes; older snapshots are then ignored
+SNAPSHOT_VERSION = 1
+
+# Longest text openpyxl writes to a cell
+MAX_CELL_TEXT = 32767
+
+
+class _Unpredictable(Exception):
+    """A cell whose read-back value can't be told without writing it."""
+
+
+def master_snapshot(df: pd.DataFrame) -> Optional[pd.DataFrame]:
+    """
+    The frame reading back a sheet written from df (see write_sheet) would
+    give, worked out from the values instead of a parse of the written XML.
+    None if any cell can't be predicted exactly (dates, formula-like text,
+    carriage returns, ...); such trackers just go without a snapshot.
+    """
+    try:
+        columns = [[_read_back(value) for value in df.iloc[:, i].tolist()] for i in range(df.shape[1])]
+        header = [_read_back(str(name)) for name in df.columns]
+    except _Unpredictable:
+        return None
+    data = [header] + [list(row) for row in zip(*columns)]
+    return rows_frame(data)
+
+
+def _read_back(value):
+    """A written value (see excel_writer._excel_value) as the reader returns it."""
+    if value is None or value is pd.NaT:
+        return ""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        if isinstance(value, float) and math.isnan(value):
+            return ""
+        if isinstance(value, float) and math.isinf(value):
+            return _read_back_text("inf" if value > 0 else "-inf")
+        # openpyxl writes numbers with 16 significant digits
+        return number_value("%.16g" % value)
+    if isinstance(value, str):
+        return _read_back_text(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        raise _Unpredictable(value)
+    if pd.api.types.is_scalar(value) and pd.isna(value):
+        return ""
+    if hasattr(value, "item"):
+        return _read_back(value.item())
+    return _read_back_text(str(value))
+
+
+def _read_back_text(value: str):
+    value = value[:MAX_CELL_TEXT]
+    if not value:
+        return ""
+    # Written as formulas or error cells; XML parsing turns \r into \n
+    if (len(value) > 1 and value.startswith("=")) or value in ERROR_CODES or "\r" in value:
+        raise _Unpredictable(value)
+    if ILLEGAL_CHARACTERS_RE.search(value):
+        raise _Unpredictable(value)
+    return value
+
+
+def save_workbook(wb: Workbook, snapshot: pd.DataFrame = None) -> io.BytesIO:
+    """
+    Workbook.save into memory, adding the snapshot (see master_snapshot) of
+    the first sheet as SNAPSHOT_PART, registered in [Content_Types].xml.
+    """
+    output = io.BytesIO()
+    wb.properties.modified = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    writer = ExcelWriter(wb, zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED, allowZip64=True))
+    if snapshot is not None:
+        writer.manifest.Override.append(
+            Override(PartName="/" + SNAPSHOT_PART, ContentType=SNAPSHOT_CONTENT_TYPE))
+    writer.save()
+
+    if snapshot is not None:
+        # The digest covers the parts as written, so it is taken once they are
+        with zipfile.ZipFile(output, "a", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(SNAPSHOT_PART, _encode(snapshot, sheet_digest(archive)))
+    output.seek(0)
+    return output
+
+
+def sheet_digest(archive: zipfile.ZipFile) -> str:
+    """SHA-256 of the parts deciding what the first sheet reads as."""
+    sheet_path, rels = sheet_part(archive)
+    digest = hashlib.sha256()
+    for name in ["xl/workbook.xml", "xl/_rels/workbook.xml.rels", sheet_path, *sorted(rels.values())]:
+        digest.update(name.encode())
+        with archive.open(name) as src:
+            while chunk := src.read(1024 * 1024):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _encode(df: pd.DataFrame, digest: str) -> bytes:
+    payload = {
+        "version": SNAPSHOT_VERSION,
+        "sheet_sha256": digest,
+        "columns": df.columns.tolist(),
+        "dtypes": [str(dtype) for dtype in df.dtypes],
+        # NaN and infinities go in as the NaN/Infinity literals json reads back
+        "data": [df.iloc[:, i].tolist() for i in range(df.shape[1])],
+    }
+    return zlib.compress(json.dumps(payload, separators=(",", ":")).encode())
+
+
+def read_snapshot(source) -> Optional[pd.DataFrame]:
+    """
+    The first sheet of a tracker (path or file object) from its snapshot, or
+    None when it has none, or the sheet no longer matches it (e.g. the
+    workbook was edited and saved by a spreadsheet app).
+    """
+    try:
+        with zipfile.ZipFile(source) as archive:
+            if SNAPSHOT_PART not in archive.namelist():
+                return None
+            payload = json.loads(zlib.decompress(archive.read(SNAPSHOT_PART)))
+            if payload.get("version") != SNAPSHOT_VERSION:
+                return None
+            if payload.get("sheet_sha256") != sheet_digest(archive):
+                return None
+        return pd.DataFrame({
+            i: pd.Series(values, dtype=np.dtype(dtype) if dtype != "object" else object)
+            for i, (values, dtype) in enumerate(zip(payload["data"], payload["dtypes"]))
+        }).set_axis(pd.Index(payload["columns"]), axis=1)
+    except Exception:
+        return None
@@ -0,0 +1,22 @@
+# app/uploads.py
+import os
+import tempfile
+from fastapi import UploadFile
+
+# Uploads are copied to disk in chunks of this size
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+async def spool_upload(upload: UploadFile, directory: str) -> str:
+    """
+    Streams an upload to a temp file inside `directory` and returns its path.
+    Only one chunk is held in memory at a time; the caller owns cleanup
+    (normally by spooling into a per-request TemporaryDirectory).
+    """
+    suffix = os.path.splitext(upload.filename or "")[1].lower()
+    fd, path = tempfile.mkstemp(dir=directory, suffix=suffix)
+    with os.fdopen(fd, "wb") as out:
+        while chunk := await upload.read(UPLOAD_CHUNK_BYTES):
+            out.write(chunk)
+    await upload.close()
+    return path
@@ -0,0 +1,91 @@
+# app/workers.py
+import multiprocessing
+import resource
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class WorkerBudgetExceeded(Exception):
+    """A task ran past its wall-clock or memory budget and was stopped."""
+
+    def __init__(self, kind: str, message: str, elapsed: float):
+        super().__init__(message)
+        self.kind = kind  # "timeout" or "memory"
+        self.elapsed = elapsed
+
+
+class WorkerFailed(Exception):
+    """A task raised inside its worker process, or the process died."""
+
+
+def _child_main(conn, fn, args, memory_budget_mb):
+    if memory_budget_mb:
+        limit = memory_budget_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    try:
+        conn.send(("ok", fn(*args)))
+    except MemoryError:
+        conn.send(("memory", f"exceeded {memory_budget_mb} MB memory budget"))
+    except Exception as e:
+        # Send text only: library exceptions are not always picklable
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+class BudgetedProcessPool:
+    """
+    Executor-style pool where every task runs in its own killable process.
+    A task still running after `time_budget` seconds is killed, and the
+    address-space limit turns runaway allocations into a MemoryError in the
+    worker. Either way the task's future fails with WorkerBudgetExceeded
+    while the other tasks carry on.
+    """
+
+    def __init__(self, max_workers: int, time_budget: float = 0,
+                 memory_budget_mb: int = 0, preload: list[str] = None):
+        self.time_budget = time_budget or None
+        self.memory_budget_mb = memory_budget_mb
+        # Each worker thread supervises one child process at a time
+        self._threads = ThreadPoolExecutor(max_workers=max_workers)
+        # forkserver avoids forking the threaded server process; preloading
+        # keeps per-task startup to a cheap fork of an already-imported parser.
+        self._ctx = multiprocessing.get_context("forkserver")
+        if preload:
+            self._ctx.set_forkserver_preload(preload)
+
+    def submit(self, fn, *args) -> Future:
+        return self._threads.submit(self._run, fn, args)
+
+    def _run(self, fn, args):
+        receiver, sender = self._ctx.Pipe(duplex=False)
+        proc = self._ctx.Process(
+            target=_child_main, args=(sender, fn, args, self.memory_budget_mb), daemon=True)
+        began = time.monotonic()
+        proc.start()
+        sender.close()
+
+        try:
+            if not receiver.poll(self.time_budget):
+                raise WorkerBudgetExceeded(
+                    "timeout", f"exceeded {self.time_budget:g}s time budget",
+                    time.monotonic() - began)
+            try:
+                kind, payload = receiver.recv()
+            except EOFError:
+                proc.join()
+                raise WorkerFailed(f"worker died (exit code {proc.exitcode})")
+        finally:
+            if proc.is_alive():
+                proc.kill()
+            proc.join()
+            receiver.close()
+
+        if kind == "memory":
+            raise WorkerBudgetExceeded("memory", payload, time.monotonic() - began)
+        if kind == "error":
+            raise WorkerFailed(payload)
+        return payload
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False) -> None:
+        self._threads.shutdown(wait=wait, cancel_futures=cancel_futures)
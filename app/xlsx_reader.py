@@ -0,0 +1,172 @@
+# app/xlsx_reader.py
+import posixpath
+import zipfile
+from xml.etree.ElementTree import fromstring, iterparse
+import numpy as np
+import pandas as pd
+from openpyxl.cell.text import Text
+from openpyxl.reader.strings import read_string_table
+from openpyxl.styles.stylesheet import Stylesheet
+from openpyxl.utils.cell import column_index_from_string
+from openpyxl.utils.datetime import (
+    CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_ISO8601, from_excel
+)
+from pandas.io.parsers import TextParser
+
+MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+ROW_TAG = MAIN_NS + "row"
+CELL_TAG = MAIN_NS + "c"
+VALUE_TAG = MAIN_NS + "v"
+INLINE_TAG = MAIN_NS + "is"
+TEXT_TAG = MAIN_NS + "t"
+
+
+def read_sheet(source, sheet_name: str = None, **parser_options) -> pd.DataFrame:
+    """
+    pd.read_excel(source, sheet_name=sheet_name or 0, ...) without openpyxl's
+    per-cell objects: the sheet XML is streamed with ElementTree and each
+    cell converted the way openpyxl (read-only, data_only) and pandas'
+    reader would, so the frame comes out the same (values, dtypes, header
+    handling). parser_options (e.g. dtype) go to pandas' TextParser as
+    read_excel would pass them. Raises KeyError if there is no such sheet.
+    """
+    with zipfile.ZipFile(source) as archive:
+        sheet_path, rels = sheet_part(archive, sheet_name)
+        shared_strings = []
+        if "sharedStrings" in rels:
+            with archive.open(rels["sharedStrings"]) as src:
+                shared_strings = read_string_table(src)
+        date_styles = set()
+        if "styles" in rels:
+            date_styles = Stylesheet.from_tree(fromstring(archive.read(rels["styles"]))).date_formats
+        epoch = CALENDAR_MAC_1904 if _is_date1904(archive) else CALENDAR_WINDOWS_1900
+
+        with archive.open(sheet_path) as src:
+            data = _sheet_rows(src, shared_strings, date_styles, epoch)
+
+    return rows_frame(data, **parser_options)
+
+
+def rows_frame(data: list[list], **parser_options) -> pd.DataFrame:
+    """
+    The frame pandas makes of a sheet's rows (header first, "" for empty
+    cells). Trailing empty cells and rows are dropped and rows padded to the
+    widest, as pandas' openpyxl reader does.
+    """
+    for row in data:
+        while row and row[-1] == "":
+            row.pop()
+    while data and not data[-1]:
+        data.pop()
+    if not data:
+        return pd.DataFrame()
+
+    width = max(len(row) for row in data)
+    for row in data:
+        if len(row) < width:
+            row.extend([""] * (width - len(row)))
+    return TextParser(data, header=0, skip_blank_lines=False, **parser_options).read()
+
+
+def sheet_part(archive: zipfile.ZipFile, sheet_name: str = None) -> tuple[str, dict]:
+    """Zip path of the named (or first) sheet, and of the shared strings / styles parts."""
+    workbook = fromstring(archive.read("xl/workbook.xml"))
+    sheets = workbook.findall(f"{MAIN_NS}sheets/{MAIN_NS}sheet")
+    if sheet_name is not None:
+        sheets = [sheet for sheet in sheets if sheet.get("name") == sheet_name]
+    if not sheets:
+        raise KeyError(f"no sheet {sheet_name!r}")
+    rel_id = sheets[0].get(f"{REL_NS}id")
+
+    targets = {}
+    parts = {}
+    for rel in fromstring(archive.read("xl/_rels/workbook.xml.rels")).iter(f"{PKG_REL_NS}Relationship"):
+        target = rel.get("Target")
+        target = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+        targets[rel.get("Id")] = target
+        kind = rel.get("Type").rsplit("/", 1)[-1]
+        if kind in ("sharedStrings", "styles"):
+            parts[kind] = target
+    return targets[rel_id], parts
+
+
+def _is_date1904(archive: zipfile.ZipFile) -> bool:
+    properties = fromstring(archive.read("xl/workbook.xml")).find(f"{MAIN_NS}workbookPr")
+    return properties is not None and properties.get("date1904") in ("1", "true")
+
+
+def _sheet_rows(src, shared_strings: list, date_styles: set, epoch) -> list[list]:
+    """The sheet's rows of cell values, missing rows and cells as empty ones."""
+    data = []
+    expected_row = 1
+    for _, element in iterparse(src):
+        if element.tag != ROW_TAG:
+            continue
+
+        number = element.get("r")
+        number = int(float(number)) if number else expected_row
+        if number < expected_row:
+            # Out-of-order rows are skipped, as openpyxl does
+            element.clear()
+            continue
+        # Missing rows read as empty ones
+        data.extend([] for _ in range(expected_row, number))
+        expected_row = number + 1
+
+        row = []
+        column = 0
+        for cell in element.iter(CELL_TAG):
+            reference = cell.get("r")
+            column = column_index_from_string(reference.rstrip("0123456789")) if reference else column + 1
+            if column > len(row):
+                row.extend([""] * (column - len(row)))
+            row[column - 1] = _cell_value(cell, shared_strings, date_styles, epoch)
+        element.clear()
+        data.append(row)
+    return data
+
+
+def number_value(text: str):
+    """A numeric cell's value as pandas reads it: integral values come out as int."""
+    number = float(text) if "." in text or "E" in text or "e" in text else int(text)
+    as_int = int(number)
+    return as_int if as_int == number else float(number)
+
+
+def _cell_value(cell, shared_strings: list, date_styles: set, epoch):
+    data_type = cell.get("t", "n")
+    if data_type == "inlineStr":
+        inline = cell.find(INLINE_TAG)
+        if inline is None:
+            return ""
+        if len(inline) == 1 and inline[0].tag == TEXT_TAG:
+            value = inline[0].text or ""
+        else:
+            value = Text.from_tree(inline).content
+        return value if value is not None else ""
+
+    value = cell.findtext(VALUE_TAG) or None
+    if value is None:
+        return ""
+    if data_type == "n":
+        number = number_value(value)
+        if int(cell.get("s", 0)) in date_styles:
+            try:
+                return from_excel(number, epoch)
+            except (OverflowError, ValueError):
+                # openpyxl reads out-of-range dates as errors
+                return np.nan
+        return number
+    if data_type == "s":
+        return shared_strings[int(value)]
+    if data_type == "b":
+        return bool(int(value))
+    if data_type == "e":
+        return np.nan
+    if data_type == "d":
+        return from_ISO8601(value)
+    # "str": formula result text
+    return value
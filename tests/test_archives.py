@@ -0,0 +1,70 @@
+# tests/test_archives.py
+import io
+import struct
+import tarfile
+import zipfile
+import pytest
+from app.archives import ArchiveError, iter_archive_pdfs
+
+PDF = b"%PDF-1.4 not really parsed here"
+
+
+def _zip_bytes(**members) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return buffer.getvalue()
+
+
+def _patch_central_directory(data: bytes, offset: int, value: int) -> bytes:
+    """Overwrites a 2-byte field of the (only) central directory entry."""
+    at = data.index(b"PK\x01\x02") + offset
+    return data[:at] + struct.pack("<H", value) + data[at + 2:]
+
+
+def _write(tmp_path, name: str, data: bytes) -> str:
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_zip_members_are_spooled(tmp_path):
+    path = _write(tmp_path, "batch.zip", _zip_bytes(**{"a.pdf": PDF, "notes.txt": b"skip"}))
+    spooled = list(iter_archive_pdfs(path, str(tmp_path), 1024))
+    assert [name for _, name in spooled] == ["a.pdf"]
+    with open(spooled[0][0], "rb") as f:
+        assert f.read() == PDF
+
+
+def test_tar_members_are_spooled(tmp_path):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tf:
+        info = tarfile.TarInfo("dir/b.pdf")
+        info.size = len(PDF)
+        tf.addfile(info, io.BytesIO(PDF))
+    path = _write(tmp_path, "batch.tar.gz", buffer.getvalue())
+    assert [name for _, name in iter_archive_pdfs(path, str(tmp_path), 1024)] == ["b.pdf"]
+
+
+@pytest.mark.parametrize("offset, value", [
+    (8, 0x1),    # general purpose flags: encrypted
+    (10, 99),    # compression method: AES, which zipfile can't read
+])
+def test_unreadable_zip_member_is_an_archive_error(tmp_path, offset, value):
+    data = _patch_central_directory(_zip_bytes(**{"a.pdf": PDF}), offset, value)
+    path = _write(tmp_path, "batch.zip", data)
+    with pytest.raises(ArchiveError):
+        list(iter_archive_pdfs(path, str(tmp_path), 1024))
+
+
+def test_oversized_member_is_an_archive_error(tmp_path):
+    path = _write(tmp_path, "batch.zip", _zip_bytes(**{"a.pdf": PDF}))
+    with pytest.raises(ArchiveError, match="too large"):
+        list(iter_archive_pdfs(path, str(tmp_path), len(PDF) - 1))
+
+
+def test_corrupt_zip_is_an_archive_error(tmp_path):
+    path = _write(tmp_path, "batch.zip", b"PK\x03\x04 truncated")
+    with pytest.raises(ArchiveError):
+        list(iter_archive_pdfs(path, str(tmp_path), 1024))
@@ -0,0 +1,81 @@
+# tests/test_experience_parser.py
+import random
+import re
+from typing import Tuple, Optional
+import pytest
+from app.experience_parser import extract_experience_years, extract_experience_years_batch
+
+
+def reference_experience_years(text: str) -> Tuple[Optional[int], Optional[int]]:
+    """
+    The four-search implementation extract_experience_years replaced,
+    kept verbatim as the oracle for the single-pass pattern.
+    """
+    t = (text or "").lower()
+    t = t.replace("–", "-").replace("—", "-")  # Normalize dashes
+
+    # 1. "3 to 5 years"
+    m = re.search(r'(\d+)\s*to\s*(\d+)\s*y', t)
+    if m:
+        return int(m.group(1)), int(m.group(2))
+
+    # 2. "3-5 years" or "3 - 5 years"
+    m = re.search(r'(\d+)\s*-\s*(\d+)\s*y', t)
+    if m:
+        return int(m.group(1)), int(m.group(2))
+
+    # 3. "3+ years"
+    m = re.search(r'(\d+)\+\s*y', t)
+    if m:
+        return int(m.group(1)), None
+
+    # 4. "Minimum 3 years" or just "3 years"
+    m = re.search(r'(?:min|minimum|at least)?\s*(\d+)\s*y', t)
+    if m:
+        v = int(m.group(1))
+        return v, v
+
+    return None, None
+
+
+# Fragments the patterns care about, plus case, dash and Unicode variants
+# whose lowercasing or digit class could tell the two apart
+TOKENS = [
+    "0", "1", "3", "5", "12", "٣", " ", "  ", "\n", "\t",
+    "to", "TO", "To", "tO", " to ", "t", "o", "-", " - ", "–", "—", "+",
+    "y", "Y", "years", "Yrs", "yrs", "min", "minimum", "at least", "At Least",
+    "exp", "x", "a", "İ", "ſ", "K", ".", ",", "(", ")",
+]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_reference_on_random_text(seed):
+    rng = random.Random(seed)
+    for _ in range(20000):
+        text = "".join(rng.choice(TOKENS) for _ in range(rng.randint(0, 14)))
+        assert extract_experience_years(text) == reference_experience_years(text), repr(text)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("3 to 5 years", (3, 5)),
+    ("3-5 years", (3, 5)),
+    ("3 – 5 Years", (3, 5)),
+    ("4+ years", (4, None)),
+    ("Minimum 3 years", (3, 3)),
+    # A later higher-priority pattern wins over an earlier one
+    ("2 years in QA, 4-6 years overall", (4, 6)),
+    ("5+ yrs, 1 to 3 years", (1, 3)),
+    ("no experience mentioned", (None, None)),
+    ("", (None, None)),
+    (None, (None, None)),
+])
+def test_examples(text, expected):
+    assert extract_experience_years(text) == expected == reference_experience_years(text)
+
+
+def test_batch_matches_per_block():
+    rng = random.Random(0)
+    texts = ["".join(rng.choice(TOKENS) for _ in range(rng.randint(0, 14))) for _ in range(2000)]
+    texts += ["3 to 5 years", "", None]
+    assert extract_experience_years_batch(texts) == [reference_experience_years(t) for t in texts]
+    assert extract_experience_years_batch([]) == []
@@ -0,0 +1,59 @@
+# tests/test_parser.py
+import random
+import pytest
+from app.parser import DELIMITER_PATTERN, iter_blocks, split_blocks
+
+
+def reference_split_blocks(text_pages: list[str]) -> list[str]:
+    """
+    The join-then-split implementation iter_blocks replaced, kept as the
+    oracle for the streaming splitter.
+    """
+    full_text = "\n".join(text_pages)
+
+    if not full_text.strip():
+        return []
+
+    blocks = DELIMITER_PATTERN.split(full_text)
+    return [b.strip() for b in blocks if len(b.strip()) > 50]
+
+
+# Delimiter characters and whitespace in runs that can straddle a page
+# boundary, plus filler long enough to clear the >50 character noise filter
+TOKENS = [
+    "\n", " ", "\t", "\n\n", "=", "-", "_", "==", "---", "___", "=====",
+    "\n---\n", "\n===\n", " \n", "\n ", "x", "Job",
+    "Senior Engineer, 3-5 years of Python, remote friendly team",
+    "QA lead wanted - 4+ yrs",
+]
+
+
+def random_pages(rng: random.Random) -> list[str]:
+    return [
+        "".join(rng.choice(TOKENS) for _ in range(rng.randint(0, 8)))
+        for _ in range(rng.randint(0, 6))
+    ]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_reference_on_random_pages(seed):
+    rng = random.Random(seed)
+    for _ in range(5000):
+        pages = random_pages(rng)
+        assert list(iter_blocks(pages)) == reference_split_blocks(pages), repr(pages)
+
+
+def test_block_spanning_pages_stays_whole():
+    first = "Backend Engineer\nWe are hiring a backend engineer with"
+    second = "3-5 years of experience in Python and SQL.\n=====\nTrailer"
+    assert split_blocks([first, second]) == [f"{first}\n{second.split(chr(10))[0]}"]
+
+
+def test_blocks_stream_before_the_last_page():
+    job = "Data Analyst\n" + "Builds dashboards and reports for the sales team. " * 2
+
+    def pages():
+        yield f"{job}\n-----\nnext"
+        pytest.fail("read the second page before yielding the first block")
+
+    assert next(iter_blocks(pages())) == job.strip()
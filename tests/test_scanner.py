@@ -0,0 +1,32 @@
+# tests/test_scanner.py
+import random
+from app.scanner import SCAN_KEYWORDS, KeywordHits, scan_block
+
+# Keywords, their overlaps and prefixes, case variants and filler
+TOKENS = list(SCAN_KEYWORDS) + [kw.upper() for kw in SCAN_KEYWORDS[::7]] + [
+    kw[:-1] for kw in SCAN_KEYWORDS[::5] if len(kw) > 2
+] + [" ", "\n", "-", "İ", "x", "qa", "QA Engineer"]
+
+
+def test_matches_substring_search():
+    rng = random.Random(0)
+    for _ in range(3000):
+        text = "".join(rng.choice(TOKENS) for _ in range(rng.randint(0, 12)))
+        lower = text.lower()
+        hits = scan_block(text)
+        assert hits.found() == {kw for kw in SCAN_KEYWORDS if kw in lower}, repr(text)
+        assert hits.present(SCAN_KEYWORDS) == [kw for kw in SCAN_KEYWORDS if kw in lower]
+        assert hits.first(SCAN_KEYWORDS) == next((kw for kw in SCAN_KEYWORDS if kw in lower), None)
+        # Keywords outside the vocabulary are searched on demand
+        for kw in ("qa eng", "QA", "x\n"):
+            assert hits[kw] == (kw in lower)
+
+
+def test_masks_round_trip():
+    text = "Senior QA Engineer, Selenium and Java, Bangalore / remote"
+    hits = scan_block(text)
+    rebuilt = KeywordHits.from_masks(text, list(SCAN_KEYWORDS), *hits.to_masks())
+    assert rebuilt.found() == hits.found()
+    # Masks over another vocabulary, or a partial lookup, fall back to a rescan
+    assert KeywordHits.from_masks(text, ["java"], 1, 0).found() == hits.found()
+    assert KeywordHits.from_masks(text, list(SCAN_KEYWORDS), 1, 0).found() == hits.found()
@@ -0,0 +1,74 @@
+# tests/test_snapshot.py
+import datetime
+import io
+import zipfile
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from app.excel_writer import generate_master_excel
+from app.snapshot import SNAPSHOT_PART, read_snapshot
+from app.xlsx_reader import read_sheet
+
+SHEET_XML = "xl/worksheets/sheet1.xml"
+
+
+def _tracker() -> bytes:
+    df = pd.DataFrame({
+        "S.No": [1, 2, 3],
+        "Company": ["Acme", "Globex", "Initech"],
+        "Role": ["QA Engineer", "Data Analyst, SQL", "  padded  "],
+        "Exp": ["3-5", "N/A", np.nan],
+        "Email": ["jobs@acme.test", None, "hr@initech.test"],
+        "Notes": [12345678901234567, 2.5, True],
+        "Last Updated": ["2024-03-01 09:30:00", "", "2024-03-02 10:00:00"],
+    })
+    return generate_master_excel(df).getvalue()
+
+
+def _rewrite_part(data: bytes, name: str, edit) -> bytes:
+    """data with the zip part name replaced by edit(its bytes), every other part kept."""
+    output = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(data)) as src, zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as dst:
+        for item in src.infolist():
+            content = src.read(item)
+            dst.writestr(item, edit(content) if item.filename == name else content)
+    return output.getvalue()
+
+
+def test_snapshot_matches_read_sheet():
+    data = _tracker()
+    snapshot = read_snapshot(io.BytesIO(data))
+    assert snapshot is not None
+    pd.testing.assert_frame_equal(snapshot, read_sheet(io.BytesIO(data)))
+
+
+def test_snapshot_ignored_once_the_sheet_changes():
+    data = _tracker()
+    edited = _rewrite_part(data, SHEET_XML, lambda xml: xml.replace(b"Globex", b"Umbrella"))
+    assert edited != data
+    with zipfile.ZipFile(io.BytesIO(edited)) as archive:
+        assert SNAPSHOT_PART in archive.namelist()
+    assert read_snapshot(io.BytesIO(edited)) is None
+    assert "Umbrella" in read_sheet(io.BytesIO(edited))["Company"].tolist()
+
+
+def test_snapshot_dropped_when_saved_by_openpyxl():
+    wb = load_workbook(io.BytesIO(_tracker()))
+    wb.active["B2"] = "Umbrella"
+    output = io.BytesIO()
+    wb.save(output)
+    output.seek(0)
+    assert read_snapshot(output) is None
+
+
+def test_unpredictable_cells_skip_the_snapshot():
+    df = pd.DataFrame({"S.No": [1], "Company": ["=HYPERLINK(\"x\")"], "Last Updated": [datetime.datetime(2024, 3, 1)]})
+    with zipfile.ZipFile(generate_master_excel(df)) as archive:
+        assert SNAPSHOT_PART not in archive.namelist()
+
+
+def test_modified_time_is_utc():
+    before = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None, microsecond=0)
+    modified = load_workbook(io.BytesIO(_tracker())).properties.modified
+    after = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    assert before <= modified <= after
@@ -0,0 +1,111 @@
+# tests/test_xlsx_reader.py
+import datetime
+import io
+import zipfile
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+from app.xlsx_reader import read_sheet
+
+SHEET_XML = "xl/worksheets/sheet1.xml"
+
+
+def _workbook_bytes(rows: dict, title: str = "Sheet") -> bytes:
+    """A one-sheet workbook with {cell reference: value} written by openpyxl."""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = title
+    for reference, value in rows.items():
+        ws[reference] = value
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+def _with_sheet_xml(data: bytes, sheet_data: str) -> bytes:
+    """data with the first sheet's <sheetData> replaced by sheet_data."""
+    sheet = (
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        f"<sheetData>{sheet_data}</sheetData></worksheet>"
+    )
+    output = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(data)) as src, zipfile.ZipFile(output, "w") as dst:
+        for item in src.infolist():
+            dst.writestr(item, sheet if item.filename == SHEET_XML else src.read(item))
+    return output.getvalue()
+
+
+def _assert_reads_like_pandas(tmp_path, data: bytes, sheet_name: str = None, **options):
+    """read_sheet gives pd.read_excel's frame, from a path and from a file object."""
+    path = tmp_path / "book.xlsx"
+    path.write_bytes(data)
+    expected = pd.read_excel(path, sheet_name=sheet_name or 0, **options)
+    pd.testing.assert_frame_equal(read_sheet(str(path), sheet_name, **options), expected)
+    pd.testing.assert_frame_equal(read_sheet(io.BytesIO(data), sheet_name, **options), expected)
+    return expected
+
+
+def test_sparse_rows_and_columns(tmp_path):
+    data = _workbook_bytes({
+        "A1": "S.No", "B1": "Company", "D1": "Notes",
+        "A2": 1, "B2": "Acme",
+        # Row 3 missing entirely, row 4 only past the header's last column
+        "F4": "stray",
+        "A5": 3, "D5": "remote",
+        "C7": "",
+    })
+    _assert_reads_like_pandas(tmp_path, data)
+
+
+def test_numeric_cells(tmp_path):
+    data = _workbook_bytes({
+        "A1": "int", "B1": "float", "C1": "mixed", "D1": "big", "E1": "date",
+        "A2": 1, "B2": 1.5, "C2": 2, "D2": 12345678901234567, "E2": datetime.datetime(2024, 3, 1, 9, 30),
+        "A3": -7, "B3": 2.0, "C3": 0.25, "D3": 1e-9, "E3": datetime.date(1999, 12, 31),
+        "A4": 0, "B4": 1e300, "C4": "n/a",
+    })
+    _assert_reads_like_pandas(tmp_path, data)
+
+
+def test_boolean_cells(tmp_path):
+    data = _workbook_bytes({
+        "A1": "Remote", "B1": "Mixed",
+        "A2": True, "B2": False,
+        "A3": False, "B3": 1,
+        "A4": True,
+    })
+    _assert_reads_like_pandas(tmp_path, data)
+
+
+def test_inline_and_rich_strings(tmp_path):
+    # openpyxl only writes shared strings; spreadsheet exports often use inline ones
+    data = _with_sheet_xml(_workbook_bytes({"A1": "x"}), (
+        '<row r="1"><c r="A1" t="inlineStr"><is><t>Title</t></is></c>'
+        '<c r="B1" t="inlineStr"><is><t>Company</t></is></c></row>'
+        '<row r="2"><c r="A2" t="inlineStr"><is><t xml:space="preserve">  padded  </t></is></c>'
+        '<c r="B2" t="inlineStr"><is><r><t>Ac</t></r><r><rPr><b/></rPr><t>me</t></r></is></c></row>'
+        '<row r="4"><c r="B4" t="inlineStr"><is><t/></is></c>'
+        '<c r="A4" t="str"><v>formula text</v></c></row>'
+        '<row r="5"><c r="A5" t="e"><v>#N/A</v></c><c r="B5" t="b"><v>1</v></c></row>'
+    ))
+    _assert_reads_like_pandas(tmp_path, data)
+
+
+def test_cells_without_references(tmp_path):
+    data = _with_sheet_xml(_workbook_bytes({"A1": "x"}), (
+        '<row><c t="inlineStr"><is><t>a</t></is></c><c t="inlineStr"><is><t>b</t></is></c></row>'
+        '<row><c><v>1</v></c><c><v>2.5</v></c></row>'
+        '<row><c r="B3"><v>3</v></c></row>'
+    ))
+    _assert_reads_like_pandas(tmp_path, data)
+
+
+def test_named_sheet_and_parser_options(tmp_path):
+    data = _workbook_bytes({"A1": "key", "B1": "value", "A2": 10, "B2": True}, title="Signatures")
+    _assert_reads_like_pandas(tmp_path, data, sheet_name="Signatures", dtype=str)
+    with pytest.raises(KeyError):
+        read_sheet(io.BytesIO(data), "missing")
+
+
+def test_empty_sheet(tmp_path):
+    _assert_reads_like_pandas(tmp_path, _workbook_bytes({}))